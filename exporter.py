@@ -1,26 +1,76 @@
-from typing import List, Tuple, Dict
+from typing import List, Tuple, Dict, Optional, Union, Callable, Iterable, TextIO
+from itertools import islice
 import matplotlib.pyplot as plt
+import numpy as np
 import csv
+import hashlib
 import json
+import os
+
+MISSING = 0
+"""Sentinel stored in Review.year and Review.month when the review date is unknown."""
+
+MONTHS = ('January', 'February', 'March', 'April', 'May', 'June',
+          'July', 'August', 'September', 'October', 'November', 'December')
 
 class Review:
     """
     Represents a customer review.
 
+    Reviews are stored compactly using __slots__; year_month is derived from the parsed year and month, unless the
+    original timestamp was written differently, in which case it is kept as is.
+
     Attributes:
         review_id (int): Unique identifier for the review.
         rating (int): Rating given by the reviewer (1-5 scale).
-        year_month (str): Review timestamp in "YYYY-MM" format.
+        year (int): Parsed review year, or MISSING if the date is unknown.
+        month (int): Parsed review month (1-12), or MISSING if the date is unknown.
         reviewer_location (str): Location of the reviewer.
         branch (str): Branch where the review was given.
+        raw_date (Optional[str]): The original timestamp if it differs from the one derived from year and month,
+            otherwise None.
     """
 
-    def __init__(self, review_id: int, rating: int, year_month: str, reviewer_location: str, branch: str) -> None:
+    __slots__ = ('review_id', 'rating', 'year', 'month', 'reviewer_location', 'branch', 'raw_date')
+
+    FIELDS = ('review_id', 'rating', 'year_month', 'reviewer_location', 'branch')
+    """Public fields in display order."""
+
+    def __init__(self, review_id: int, rating: int, year: int, month: int, reviewer_location: str,
+                 branch: str, raw_date: Optional[str] = None) -> None:
         self.review_id = review_id
         self.rating = rating
-        self.year_month = year_month
+        self.year = year
+        self.month = month
         self.reviewer_location = reviewer_location
         self.branch = branch
+        self.raw_date = raw_date
+
+    @property
+    def year_month(self) -> str:
+        """Returns the review timestamp as it was loaded."""
+        return Review.format_date(self.year, self.month, self.raw_date)
+
+    @staticmethod
+    def format_date(year: int, month: int, raw_date: Optional[str] = None) -> str:
+        """
+        Formats a review timestamp.
+
+        Args:
+            year (int): Parsed review year, or MISSING if the date is unknown.
+            month (int): Parsed review month.
+            raw_date (Optional[str], optional): The original timestamp, returned as is if given. Defaults to None.
+
+        Returns:
+            str: The timestamp in "YYYY-M" format, or 'missing' if the date is unknown.
+        """
+        if raw_date is not None:
+            return raw_date
+        return f'{year}-{month}' if year != MISSING else 'missing'
+
+    def as_row(self) -> List[Union[int, str]]:
+        """Returns the values of the public fields in display order."""
+        return [getattr(self, field) for field in self.FIELDS]
 
     def __str__(self) -> str:
         return (f'Review ID: {self.review_id}. '
@@ -37,11 +87,19 @@ class Branch:
     Attributes:
         branch (str): The name of the branch.
         reviews (List[Review]): A list of reviews associated with this branch.
+        version (int): Counter incremented whenever the reviews are changed in place.
     """
 
     def __init__(self, branch: str, reviews: List[Review]) -> None:
         self.branch = branch
         self.reviews = reviews
+        self.version = 0
+        self._location_totals: Optional[tuple] = None
+        self._month_totals: Optional[tuple] = None
+
+    def mark_changed(self) -> None:
+        """Records that the reviews have been modified, invalidating any cached query results."""
+        self.version += 1
 
     def get_reviews(self) -> List[Review]:
         """Returns a copy of the reviews list."""
@@ -50,11 +108,34 @@ class Branch:
     @property
     def locations(self) -> List[str]:
         """Returns a list of unique reviewer locations."""
-        return list({review.reviewer_location for review in self.reviews})
+        return self.location_totals()[0]
+
+    def location_totals(self) -> Tuple[List[str], np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Aggregates ratings by reviewer location in a single pass, cached until the reviews change.
+
+        Returns:
+            Tuple[List[str], np.ndarray, np.ndarray, np.ndarray]: Reviewer locations with their review counts,
+            rating sums and sums of squared ratings.
+        """
+        key = (self.version, len(self.reviews))
+        if self._location_totals is None or self._location_totals[0] != key:
+            index: Dict[str, int] = {}
+            codes = np.fromiter((index.setdefault(review.reviewer_location, len(index)) for review in self.reviews),
+                                dtype=np.intp, count=len(self.reviews))
+            ratings = np.fromiter((review.rating for review in self.reviews), dtype=np.float64,
+                                  count=len(self.reviews))
+
+            counts = np.bincount(codes, minlength=len(index))
+            sums = np.bincount(codes, weights=ratings, minlength=len(index))
+            squares = np.bincount(codes, weights=ratings ** 2, minlength=len(index))
+            self._location_totals = key, (list(index), counts, sums, squares)
+
+        return self._location_totals[1]
 
     def get_reviews_years(self) -> List[str]:
         """Returns a sorted list of unique years from the reviews."""
-        return sorted({review.year_month.split('-')[0] for review in self.reviews})
+        return sorted({str(review.year) if review.year != MISSING else 'missing' for review in self.reviews})
 
     @property
     def avg_rating(self) -> float:
@@ -64,14 +145,9 @@ class Branch:
     @property
     def avg_rating_by_loc(self) -> Dict[str, float]:
         """Calculates and returns the average rating per reviewer location."""
-        ratings = {location: {'sum': 0, 'count': 0} for location in self.locations}
-
-        for review in self.reviews:
-            loc = review.reviewer_location
-            ratings[loc]['sum'] += review.rating
-            ratings[loc]['count'] += 1
-
-        return {k: round(v['sum'] / v['count'], 1) if v['count'] > 0 else 0 for k, v in ratings.items()}
+        locations, counts, sums, _ = self.location_totals()
+        return {location: round(total / count, 1) if count > 0 else 0 for location, count, total in
+                zip(locations, counts.tolist(), sums.tolist())}
 
     @property
     def review_count(self) -> int:
@@ -81,14 +157,63 @@ class Branch:
     @property
     def top_locations(self) -> List[Tuple[str, float]]:
         """Returns the top 10 reviewer locations sorted by average rating."""
-        locations = {loc: {'sum': 0, 'count': 0} for loc in self.locations}
+        return sorted(self.avg_rating_by_loc.items(), key=lambda x: x[1], reverse=True)[:10]
+
+    @property
+    def fingerprint(self) -> str:
+        """Returns a hash of the reviews, used to detect changes between exports."""
+        digest = hashlib.blake2b(digest_size=16)
+        reviews = iter(self.reviews)
+        while batch := list(islice(reviews, 10_000)):
+            Branch.update_fingerprint(digest, ((review.review_id, review.rating, review.year_month,
+                                                review.reviewer_location) for review in batch))
+        return digest.hexdigest()
+
+    @staticmethod
+    def update_fingerprint(digest: 'hashlib.blake2b', rows: Iterable[tuple]) -> None:
+        """
+        Adds reviews to a fingerprint digest, so that storage engines can compute the same hash as fingerprint.
+
+        Args:
+            digest (hashlib.blake2b): The digest to update.
+            rows (Iterable[tuple]): The review ID, rating, timestamp and reviewer location of each review.
+        """
+        digest.update(''.join(f'{review_id},{rating},{year_month},{location}\n'
+                              for review_id, rating, year_month, location in rows).encode('utf-8'))
+
+    def rating_intervals(self, by: str, z: float = 1.96) -> Dict[str, Tuple[float, float, int]]:
+        """
+        Calculates the average rating per group with a normal-approximation confidence interval.
 
-        for review in self.reviews:
-            locations[review.reviewer_location]['sum'] += review.rating
-            locations[review.reviewer_location]['count'] += 1
+        Args:
+            by (str): Either 'month' (calendar month of dated reviews) or a review attribute such as
+                'reviewer_location'.
+            z (float, optional): Critical value of the interval. Defaults to 1.96 (95%).
 
-        averages = {k: round(v['sum'] / v['count'], 1) for k, v in locations.items() if v['count'] > 0}
-        return sorted(averages.items(), key=lambda x: x[1], reverse=True)[:10]
+        Returns:
+            Dict[str, Tuple[float, float, int]]: For each group with reviews: the average rating, the interval
+            half-width (NaN for a single review) and the number of reviews.
+        """
+        if by == 'month':
+            years, months, ratings = self.time_keys()
+            valid = years != MISSING
+            names, codes, ratings = MONTHS, months[valid] - 1, ratings[valid]
+        else:
+            names, codes = np.unique(np.array([getattr(review, by) for review in self.reviews], dtype=object),
+                                     return_inverse=True)
+            ratings = np.fromiter((review.rating for review in self.reviews), dtype=np.float64)
+
+        counts = np.bincount(codes, minlength=len(names))
+        sums = np.bincount(codes, weights=ratings, minlength=len(names))
+        squares = np.bincount(codes, weights=np.square(ratings, dtype=np.float64), minlength=len(names))
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            means = sums / counts
+            variances = np.maximum(squares - counts * means ** 2, 0) / (counts - 1)
+            half_widths = np.where(counts > 1, z * np.sqrt(variances / counts), np.nan)
+
+        return {name: (round(mean, 1), round(half_width, 2), count) for name, mean, half_width, count in
+                zip(names, means.tolist(), half_widths.tolist(), counts.tolist()) if count > 0}
 
     def get_name(self) -> str:
         """Returns the formatted branch name."""
@@ -97,21 +222,148 @@ class Branch:
     @property
     def avg_popularity_by_month(self) -> List[Tuple[str, float]]:
         """Returns the average rating per month, ensuring all months are included."""
-        months_tuple = ('January', 'February', 'March', 'April', 'May', 'June',
-                        'July', 'August', 'September', 'October', 'November', 'December')
+        keys, counts, sums = self.month_totals()
 
-        monthly_ratings = {month: {'sum': 0, 'count': 0} for month in months_tuple}
+        counts = np.bincount(keys % 12, weights=counts, minlength=12)
+        sums = np.bincount(keys % 12, weights=sums, minlength=12)
 
-        for review in self.reviews:
-            if review.year_month == 'missing':
-                continue
+        return [(month, round(total / count, 1) if count > 0 else 0) for month, total, count in
+                zip(MONTHS, sums.tolist(), counts.tolist())]
+
+    def time_keys(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Returns the year, month and rating of every review as integer arrays."""
+        keys = np.array([(review.year, review.month, review.rating) for review in self.reviews],
+                        dtype=np.int32).reshape(-1, 3)
+        return keys[:, 0], keys[:, 1], keys[:, 2]
 
-            month_name = months_tuple[int(review.year_month.split('-')[1]) - 1]
-            monthly_ratings[month_name]['sum'] += review.rating
-            monthly_ratings[month_name]['count'] += 1
+    def month_totals(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Aggregates dated reviews by month, cached until the reviews change.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray, np.ndarray]: Sorted month keys (year * 12 + month - 1) that have
+            reviews, with their review counts and rating sums.
+        """
+        key = (self.version, len(self.reviews))
+        if self._month_totals is None or self._month_totals[0] != key:
+            years, months, ratings = self.time_keys()
+            valid = years != MISSING
+
+            keys, inverse = np.unique(years[valid].astype(np.int64) * 12 + months[valid] - 1, return_inverse=True)
+            counts = np.bincount(inverse, minlength=keys.size)
+            sums = np.bincount(inverse, weights=ratings[valid], minlength=keys.size)
+            self._month_totals = key, (keys, counts, sums)
+
+        return self._month_totals[1]
+
+    def monthly_series(self) -> Tuple[List[str], np.ndarray, np.ndarray]:
+        """
+        Aggregates reviews into a continuous monthly series from the first to the last dated review.
+
+        Returns:
+            Tuple[List[str], np.ndarray, np.ndarray]: Month labels ("YYYY-M"), review counts and rating sums.
+        """
+        keys, counts, sums = self.month_totals()
+        if not keys.size:
+            return [], np.zeros(0, dtype=np.int64), np.zeros(0)
+
+        first = int(keys[0])
+        dense_counts = np.zeros(int(keys[-1]) - first + 1, dtype=np.int64)
+        dense_sums = np.zeros(dense_counts.size)
+        dense_counts[keys - first] = counts
+        dense_sums[keys - first] = sums
+
+        labels = [f'{key // 12}-{key % 12 + 1}' for key in range(first, first + dense_counts.size)]
+        return labels, dense_counts, dense_sums
+
+    @property
+    def monthly_review_volume(self) -> List[Tuple[str, int]]:
+        """Returns the number of reviews for each month, including months without reviews."""
+        labels, counts, _ = self.monthly_series()
+        return list(zip(labels, counts.tolist()))
+
+    @property
+    def monthly_avg_rating(self) -> List[Tuple[str, float]]:
+        """Returns the average rating for each month, using 0 for months without reviews."""
+        labels, counts, sums = self.monthly_series()
+        averages = np.divide(sums, counts, out=np.zeros(counts.size), where=counts > 0).round(1)
+        return list(zip(labels, averages.tolist()))
+
+    def rolling_avg_rating(self, window: int = 3) -> List[Tuple[str, float]]:
+        """
+        Returns the average rating over a rolling window of months, weighted by review count.
+
+        Args:
+            window (int, optional): Number of months in each window. Defaults to 3.
+
+        Returns:
+            List[Tuple[str, float]]: The last month of each window and its average rating.
+
+        Raises:
+            ValueError: If window is smaller than 1.
+        """
+        if window < 1:
+            raise ValueError('Window must be greater than or equal to 1!')
+
+        labels, counts, sums = self.monthly_series()
+        if len(labels) < window:
+            return []
+
+        count_sums = np.convolve(counts, np.ones(window, dtype=np.int64), mode='valid')
+        rating_sums = np.convolve(sums, np.ones(window), mode='valid')
+        averages = np.divide(rating_sums, count_sums, out=np.zeros(count_sums.size),
+                             where=count_sums > 0).round(1)
+        return list(zip(labels[window - 1:], averages.tolist()))
+
+    @property
+    def yoy_deltas(self) -> List[Tuple[int, int, float, Optional[int], Optional[float]]]:
+        """
+        Returns year-over-year review volume and average rating changes.
+
+        Returns:
+            List[Tuple[int, int, float, Optional[int], Optional[float]]]: For each year: the year, review count,
+            average rating, and the change in count and average rating against the previous year
+            (None for the first year).
+        """
+        keys, month_counts, month_sums = self.month_totals()
+        if not keys.size:
+            return []
 
-        return [(month, round(data['sum'] / data['count'], 1) if data['count'] > 0 else 0) for month, data in
-                monthly_ratings.items()]
+        years = keys // 12
+        first = int(years[0])
+        counts = np.bincount(years - first, weights=month_counts).astype(np.int64)
+        sums = np.bincount(years - first, weights=month_sums)
+        averages = np.divide(sums, counts, out=np.zeros(counts.size), where=counts > 0).round(1)
+
+        count_deltas = [None] + np.diff(counts).tolist()
+        avg_deltas = [None] + np.diff(averages).round(1).tolist()
+        return [(first + i, count, avg, count_delta, avg_delta) for i, (count, avg, count_delta, avg_delta) in
+                enumerate(zip(counts.tolist(), averages.tolist(), count_deltas, avg_deltas))]
+
+
+class SampledBranch(Branch):
+    """
+    Represents a branch holding a random sample of its reviews.
+
+    Attributes:
+        branch (str): The name of the branch.
+        reviews (List[Review]): The sampled reviews.
+        population (int): The number of reviews the sample was drawn from.
+    """
+
+    def __init__(self, branch: str, reviews: List[Review], population: int = 0) -> None:
+        super().__init__(branch, reviews)
+        self.population = population
+
+    @property
+    def review_count(self) -> int:
+        """Returns the total number of reviews in the population."""
+        return self.population
+
+    @property
+    def sample_count(self) -> int:
+        """Returns the number of sampled reviews."""
+        return len(self.reviews)
 
 
 class Chart:
@@ -155,20 +407,50 @@ class Pie(Chart):
 
 
 class Bar(Chart):
-    """Generates a Bar chart."""
+    """
+    Generates a Bar chart.
 
-    def __init__(self, title: str, labels: List[str], vals: List[int], legend: List[str] = None):
+    Attributes:
+        errors (List[float], optional): Error bar half-widths for each value, e.g. confidence intervals.
+    """
+
+    def __init__(self, title: str, labels: List[str], vals: List[int], legend: List[str] = None,
+                 errors: List[float] = None):
         super().__init__(title, labels, vals, legend)
+        self.errors = errors
         self.create()
 
     def create(self) -> None:
         """Creates and displays the bar chart."""
-        self.ax.bar(self.labels, self.vals)
+        self.ax.bar(self.labels, self.vals, yerr=self.errors, capsize=4 if self.errors else 0)
         if self.legend:
             self.ax.legend(self.legend)
         self.show()
 
 
+class Heatmap(Chart):
+    """
+    Generates a Heatmap chart.
+
+    The values form a matrix with one row per legend entry and one column per label; missing values (NaN)
+    are left blank.
+    """
+
+    def __init__(self, title: str, labels: List[str], vals: List[List[float]], legend: List[str] = None):
+        super().__init__(title, labels, vals, legend)
+        self.create()
+
+    def create(self) -> None:
+        """Creates and displays the heatmap."""
+        image = self.ax.imshow(np.array(self.vals, dtype=float), aspect='auto', cmap='RdYlGn')
+        self.ax.set_xticks(range(len(self.labels)), self.labels, rotation=90)
+        if self.legend:
+            self.ax.set_yticks(range(len(self.legend)), self.legend)
+        self.fig.colorbar(image, ax=self.ax)
+        self.fig.tight_layout()
+        self.show()
+
+
 class Table:
     """
     Represents a formatted table for displaying data.
@@ -210,6 +492,11 @@ class DataExporter:
     """
     A class to handle exporting review data from multiple branches into different file formats.
 
+    Each branch is exported to its own file in the export directory. A manifest records a fingerprint of
+    every exported branch, so later exports only rewrite the branches whose reviews have changed. Files
+    are written to a temporary file and renamed into place, so an interrupted export never leaves a
+    partially written file behind.
+
     Supported formats:
     - TXT
     - CSV
@@ -224,35 +511,62 @@ class DataExporter:
         """
         self.branches = branches
         self.filename = 'exported_data'
+        self.manifest_path = os.path.join(self.filename, 'manifest.json')
 
     def export_txt(self) -> None:
         """
-        Exports branch review data to a TXT file.
+        Exports branch review data to TXT files.
         """
-        with open(f'{self.filename}.txt', 'w', encoding='utf-8') as f:
-            for branch_name, branch in self.branches.items():
-                f.write(f'Branch: {branch_name}\n')
-                for review in branch.reviews:
-                    f.write(f'{review.review_id}, {review.rating}, {review.year_month}, {review.reviewer_location}\n')
-                f.write('\n')
-        self.confirm_export('TXT')
+        self.export('txt', self.write_txt)
 
     def export_csv(self) -> None:
         """
-        Exports branch review data to a CSV file.
+        Exports branch review data to CSV files.
         """
-        with open(f'{self.filename}.csv', 'w', newline='', encoding='utf-8') as f:
-            writer = csv.writer(f)
-            writer.writerow(['Branch', 'Review ID', 'Rating', 'Year-Month', 'Reviewer Location'])
-            for branch_name, branch in self.branches.items():
-                for review in branch.reviews:
-                    writer.writerow(
-                        [branch_name, review.review_id, review.rating, review.year_month, review.reviewer_location])
-        self.confirm_export('CSV')
+        self.export('csv', self.write_csv)
 
     def export_json(self) -> None:
         """
-        Exports branch review data to a JSON file.
+        Exports branch review data to JSON files.
+        """
+        self.export('json', self.write_json)
+
+    @staticmethod
+    def write_txt(f: TextIO, branch_name: str, branch: Branch) -> None:
+        """
+        Writes the reviews of a branch in TXT format.
+
+        :param f: The file to write to.
+        :param branch_name: The name of the branch.
+        :param branch: The branch containing review data.
+        """
+        f.write(f'Branch: {branch_name}\n')
+        for review in branch.reviews:
+            f.write(f'{review.review_id}, {review.rating}, {review.year_month}, {review.reviewer_location}\n')
+        f.write('\n')
+
+    @staticmethod
+    def write_csv(f: TextIO, branch_name: str, branch: Branch) -> None:
+        """
+        Writes the reviews of a branch in CSV format.
+
+        :param f: The file to write to.
+        :param branch_name: The name of the branch.
+        :param branch: The branch containing review data.
+        """
+        writer = csv.writer(f)
+        writer.writerow(['Branch', 'Review ID', 'Rating', 'Year-Month', 'Reviewer Location'])
+        for review in branch.reviews:
+            writer.writerow([branch_name, review.review_id, review.rating, review.year_month, review.reviewer_location])
+
+    @staticmethod
+    def write_json(f: TextIO, branch_name: str, branch: Branch) -> None:
+        """
+        Writes the reviews of a branch in JSON format.
+
+        :param f: The file to write to.
+        :param branch_name: The name of the branch.
+        :param branch: The branch containing review data.
         """
         data = {
             branch_name: [
@@ -262,16 +576,98 @@ class DataExporter:
                     "Year-Month": review.year_month,
                     "Reviewer Location": review.reviewer_location
                 } for review in branch.reviews
-            ] for branch_name, branch in self.branches.items()
+            ]
         }
-        with open(f'{self.filename}.json', 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=4)
-        self.confirm_export('JSON')
+        json.dump(data, f, indent=4)
+
+    def export(self, file_format: str, write: Callable[[TextIO, str, Branch], None]) -> None:
+        """
+        Exports every branch whose reviews changed since the last export in this format.
+
+        :param file_format: The file extension of the format (txt, csv or json).
+        :param write: Function writing the reviews of one branch to an open file.
+        """
+        os.makedirs(self.filename, exist_ok=True)
+        manifest = self.load_manifest()
+        entries = manifest.setdefault(file_format, {})
+        updated = 0
+
+        for branch_name, branch in self.branches.items():
+            path = os.path.join(self.filename, f'{branch_name}.{file_format}')
+            fingerprint = branch.fingerprint
+            if entries.get(branch_name, {}).get('fingerprint') == fingerprint and os.path.exists(path):
+                continue
+
+            self.write_atomic(path, lambda f: write(f, branch_name, branch))
+            entries[branch_name] = {'file': os.path.basename(path), 'fingerprint': fingerprint,
+                                    'rows': branch.review_count}
+            updated += 1
 
-    def confirm_export(self, file_format: str) -> None:
+        for branch_name in [name for name in entries if name not in self.branches]:
+            path = os.path.join(self.filename, entries.pop(branch_name)['file'])
+            if os.path.exists(path):
+                os.remove(path)
+
+        self.write_atomic(self.manifest_path, lambda f: json.dump(manifest, f, indent=4))
+        self.confirm_export(file_format.upper(), updated)
+
+    def export_table(self, name: str, headers: List[str], rows: List[List[Union[str, int, float]]]) -> None:
+        """
+        Exports a derived table, such as a pivot of ratings, to a CSV file in the export directory.
+
+        :param name: The file name without extension.
+        :param headers: Column headers.
+        :param rows: Rows of data.
+        """
+        os.makedirs(self.filename, exist_ok=True)
+        path = os.path.join(self.filename, f'{name}.csv')
+
+        def write(f: TextIO) -> None:
+            writer = csv.writer(f)
+            writer.writerow(headers)
+            writer.writerows(rows)
+
+        self.write_atomic(path, write)
+        print(f'Data exported successfully to {path} (CSV format).')
+
+    def load_manifest(self) -> Dict[str, Dict[str, dict]]:
+        """
+        Loads the manifest of previous exports.
+
+        :return: Exported branches by format, or an empty manifest if there is none or it cannot be read.
+        """
+        try:
+            with open(self.manifest_path, encoding='utf-8') as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        return manifest if isinstance(manifest, dict) else {}
+
+    @staticmethod
+    def write_atomic(path: str, write: Callable[[TextIO], None]) -> None:
+        """
+        Writes a file by writing a temporary file next to it and renaming it into place.
+
+        :param path: The path of the file to write.
+        :param write: Function writing the content to an open file.
+        """
+        temp_path = f'{path}.tmp'
+        try:
+            with open(temp_path, 'w', newline='', encoding='utf-8') as f:
+                write(f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_path, path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    def confirm_export(self, file_format: str, updated: int) -> None:
         """
         Confirms successful data export.
 
-        :param file_format: The format of the exported file (TXT, CSV, or JSON).
+        :param file_format: The format of the exported files (TXT, CSV, or JSON).
+        :param updated: The number of branches that were rewritten.
         """
-        print(f'Data exported successfully to {self.filename} ({file_format} format).')
+        print(f'Data exported successfully to {self.filename} ({file_format} format). '
+              f'{updated} of {len(self.branches)} branches updated.')
@@ -6,9 +6,12 @@ and program behavior. It utilizes the other modules to:
 - Visualize data via 'visual'.
 """
 
-from typing import Dict, List
-from exporter import Review, Branch, DataExporter
-from process import Process
+import argparse
+from typing import Dict, List, Optional
+from exporter import Review, Branch, SampledBranch, DataExporter, MONTHS
+from process import Process, QueryCache, ReviewLoader, SampleLoader, RatingPivot
+from storage import SQLiteLoader
+from shared import SharedLoader
 from visual import Visual
 from tui import TUI
 
@@ -22,24 +25,115 @@ class Controller:
             reviews (List[Review]): A list of reviews.
             branches (Dict[str, Branch]): A dictionary of branches containing reviews.
             reviewers_locations (List[str]): A list of unique reviewer locations.
+            query_cache (QueryCache): Cache of filtered review queries.
+            loader (ReviewLoader): Background loader filling in the branches.
+            database (Optional[str]): Path to an SQLite database to store reviews in, or None to keep them in memory.
+            shared (Optional[str]): Path to a dataset file shared with other sessions, or None to load privately.
+            sample_size (Optional[int]): Number of reviews sampled per branch, or None to load every review.
+            exact_loader (ReviewLoader): Loader of the full dataset, started when an exact result is requested
+                in sampling mode.
     """
 
-    def __init__(self):
-        """Initializes the program and starts the main menu."""
+    def __init__(self, database: Optional[str] = None, sample_size: Optional[int] = None,
+                 shared: Optional[str] = None):
+        """
+        Initializes the program and starts the main menu.
+
+        Args:
+            database (Optional[str], optional): Path to an SQLite database to store reviews in. Defaults to None.
+            sample_size (Optional[int], optional): Number of reviews to sample per branch. Defaults to None.
+            shared (Optional[str], optional): Path to a dataset file shared with other sessions. Defaults to None.
+        """
+        self.database = database
+        self.shared = shared
+        self.sample_size = sample_size
+        self.exact_loader: ReviewLoader = None
         self.reviews: List[Review] = []
         self.branches: Dict[str, Branch] = {}
         self.reviewers_locations: List[str] = []
+        self.query_cache = QueryCache()
+        self.loader: ReviewLoader = None
+        self.load_reported = False
 
         self.start()
 
     def start(self):
-        """Starts the program, loads data, and displays the main menu."""
+        """Starts the program, loads data in the background, and displays the main menu."""
         TUI.print_title()
-        self.branches = Process.read_reviews('data/disneyland_reviews.csv')
-        print(f'There are {Process.count_reviews(self.branches)} reviews.')
+        if self.sample_size:
+            self.loader = SampleLoader('data/disneyland_reviews.csv', self.sample_size)
+        elif self.database:
+            self.loader = SQLiteLoader('data/disneyland_reviews.csv', self.database)
+        elif self.shared:
+            self.loader = SharedLoader('data/disneyland_reviews.csv', self.shared)
+        else:
+            self.loader = ReviewLoader('data/disneyland_reviews.csv')
+        self.branches = self.loader.branches
+        self.loader.start()
         while True:
             self.main_menu()
 
+    def report_loading(self):
+        """Displays loading progress, the loading report once loading has finished, and query cache statistics."""
+        if not self.loader.done:
+            TUI.print_load_progress(self.loader)
+        elif not self.load_reported:
+            self.require_all()
+            TUI.print_message(f'Loading finished! There are {Process.count_reviews(self.branches)} reviews.')
+            TUI.print_validation_report(self.loader.report)
+            if self.sample_size:
+                TUI.print_message(f'Sampling mode: results are estimated from up to {self.sample_size} '
+                                  f'randomly sampled reviews per park.')
+            self.load_reported = True
+        elif self.query_cache.hits or self.query_cache.misses:
+            TUI.print_cache_stats(self.query_cache)
+
+    def require_all(self):
+        """Waits until all reviews have been loaded, displaying progress meanwhile."""
+        while not self.loader.wait(timeout=0.5):
+            TUI.print_load_progress(self.loader)
+
+    def require_branch(self, branch: str):
+        """Waits until all reviews of a branch have been loaded, displaying progress meanwhile."""
+        while not self.loader.wait_for_branch(branch, timeout=0.5):
+            TUI.print_load_progress(self.loader)
+
+    def exact_branch(self, branch: str) -> Branch:
+        """
+        Returns a branch with all of its reviews, loading the full dataset in sampling mode.
+
+        Args:
+            branch (str): The branch name.
+
+        Returns:
+            Branch: The branch with all of its reviews.
+        """
+        if not isinstance(self.branches[branch], SampledBranch):
+            return self.branches[branch]
+
+        if self.exact_loader is None:
+            self.exact_loader = ReviewLoader(self.loader.file_path)
+            self.exact_loader.start()
+        while not self.exact_loader.wait_for_branch(branch, timeout=0.5):
+            TUI.print_load_progress(self.exact_loader)
+        return self.exact_loader.branches[branch]
+
+    def exact_branches(self) -> Dict[str, Branch]:
+        """Returns every branch with all of its reviews, loading the full dataset in sampling mode."""
+        return {branch: self.exact_branch(branch) for branch in self.branches}
+
+    def approximate_title(self, title: str, branch: Optional[str] = None, interval: bool = True) -> str:
+        """Appends the sample size, and the confidence level if intervals are shown, to a title."""
+        sampled = [self.branches[branch]] if branch else list(self.branches.values())
+        return (f'{title}\n(approximate: {sum(item.sample_count for item in sampled)} of '
+                f'{sum(item.review_count for item in sampled)} reviews{", 95% CI" if interval else ""})')
+
+    def branch_names(self) -> List[str]:
+        """Returns the branches discovered so far, waiting for the first one if necessary."""
+        while not self.loader.wait_for_any_branch(timeout=0.5):
+            TUI.print_load_progress(self.loader)
+        return self.loader.branch_names()
+
     def main_menu(self):
         """Displays the main menu and handles user selection."""
         options = Process.create_options([
@@ -53,10 +147,11 @@ class Controller:
             'A': lambda: self.a_submenu(),
             'B': lambda: self.b_submenu(),
             'C': lambda: self.c_submenu(),
-            'X': lambda: exit()
+            'X': lambda: self.exit()
         }
 
         while True:
+            self.report_loading()
             TUI.print_message('Please enter the letter which corresponds with your desired menu choice:')
             TUI.print_options(options, 1)
             choice = TUI.handle_input()
@@ -77,7 +172,8 @@ class Controller:
             'View Reviews by Park',
             'Number of Reviews by Park and Reviewer Location',
             'Average Score per year by Park',
-            'Average Score per Park by Reviewer Location'
+            'Average Score per Park by Reviewer Location',
+            'Review Trends by Park'
         ])
         options['X'] = 'Go Back'
 
@@ -86,6 +182,7 @@ class Controller:
             'B': lambda: self.a_submenu_b(),
             'C': lambda: self.a_submenu_c(),
             'D': lambda: self.a_submenu_d(),
+            'E': lambda: self.a_submenu_e(),
             'X': lambda: None
         }
 
@@ -108,47 +205,120 @@ class Controller:
         """Displays reviews for a selected park."""
         branch = TUI.validate_branch(
             'For which branch would you like to see reviews?',
-            list(self.branches.keys()))
+            self.branch_names())
+        self.require_branch(branch)
         TUI.print_reviews(self.branches[branch].reviews)
 
+        if isinstance(self.branches[branch], SampledBranch):
+            sampled = self.branches[branch]
+            TUI.print_message(f'Showing a random sample of {sampled.sample_count} of {sampled.review_count} reviews.')
+            if TUI.validate_yes_no('Would you like to see every review? (Y/N)'):
+                TUI.print_reviews(self.exact_branch(branch).reviews)
+
     def a_submenu_b(self):
         """Displays the number of reviews by park and reviewer location."""
         branch = TUI.validate_branch(
             'For which reviewer location would you like to see number of reviews?',
-            list(self.branches.keys())
+            self.branch_names()
         )
+        self.require_branch(branch)
 
         location = TUI.validate_multi_choice(
             'For which reviewer location would you like to see number of reviews?',
             self.branches[branch].locations
         )
 
+        scale = 1
+        if isinstance(self.branches[branch], SampledBranch):
+            scale = self.branches[branch].review_count / max(self.branches[branch].sample_count, 1)
+
         TUI.print_reviews_count(
             branch,
             location,
-            Process.filter_reviews(self.branches[branch].get_reviews(),
-                                   {'branch': branch, 'reviewer_location': location})
+            self.query_cache.filter(self.branches[branch], {'branch': branch, 'reviewer_location': location}),
+            scale
         )
 
     def a_submenu_c(self):
         """Displays the average review score for a park in a selected year."""
         branch = TUI.validate_branch(
             'Select one of the following branches: ',
-            list(self.branches.keys())
+            self.branch_names()
         )
+        self.require_branch(branch)
         year = TUI.validate_multi_choice('Select one of the following years:',
                                          self.branches[branch].get_reviews_years())
 
+        if isinstance(self.branches[branch], SampledBranch):
+            reviews = self.query_cache.filter(self.branches[branch], {'year': year})
+            if reviews:
+                average, half_width, count = next(iter(Branch(branch, reviews).rating_intervals('branch').values()))
+                TUI.print_message(self.approximate_title(
+                    f'The average rating for {self.branches[branch].get_name()} branch in year {year} is '
+                    f'{average} ± {half_width} ({count} sampled reviews in that year)', branch))
+            else:
+                TUI.print_message(f'No sampled reviews of {self.branches[branch].get_name()} are from year {year}.')
+            if not TUI.validate_yes_no('Would you like to recompute this exactly? (Y/N)'):
+                return
+
+        reviews = self.query_cache.filter(self.exact_branch(branch), {'year': year})
+
         TUI.print_message(
             f'The average rating for {self.branches[branch].get_name()} branch in year {year} is {
-            self.branches[branch].avg_rating}')
+            Branch(branch, reviews).avg_rating}')
 
     def a_submenu_d(self):
-        """Displays the average score per park by reviewer location."""
-        TUI.print_avg_score_by_loc(self.branches)
+        """Displays the average score per park by reviewer location, with an optional chart and export."""
+        self.require_all()
+        pivot = RatingPivot(self.branches)
+
+        min_count = TUI.validate_int('What is the minimum number of reviews for a location to be shown?', 1)
+        sort_options = {'count': 'Most reviews', 'average': 'Highest average rating',
+                        'significance': 'Most significant difference', 'location': 'Location name'}
+        sort_by = TUI.validate_multi_choice('How would you like to sort the locations?', list(sort_options.values()))
+        sort_by = next(key for key, label in sort_options.items() if label == sort_by)
+
+        title = 'Average Score per Park by Reviewer Location'
+        sampled = bool(self.sample_size)
+        if sampled:
+            TUI.print_message(self.approximate_title(f'{title}, from sampled reviews only (review counts and the '
+                                                     f'minimum apply to the sample)', interval=False))
+            TUI.print_avg_score_by_loc(pivot, min_count, sort_by)
+            if TUI.validate_yes_no('Would you like to recompute this table exactly? (Y/N)'):
+                pivot, sampled = RatingPivot(self.exact_branches()), False
+                TUI.print_avg_score_by_loc(pivot, min_count, sort_by)
+        else:
+            TUI.print_avg_score_by_loc(pivot, min_count, sort_by)
+
+        if TUI.validate_yes_no('Would you like to see a chart of the top 20 locations? (Y/N)'):
+            locations, averages, _ = pivot.matrix(min_count, sort_by)
+            Visual.show_chart('heatmap', self.approximate_title(title, interval=False) if sampled else title,
+                              labels=locations[:20],
+                              vals=averages[:, :20].tolist(),
+                              legend=[self.branches[branch].get_name() for branch in pivot.branches])
+
+        if TUI.validate_yes_no('Would you like to export this table? (Y/N)'):
+            if sampled:
+                TUI.print_message('Exports contain every review, so the table is recomputed from the full dataset...')
+                pivot = RatingPivot(self.exact_branches())
+            DataExporter(self.branches).export_table(
+                'avg_score_by_location', ['Branch', 'Reviewer Location', 'Reviews', 'Average Rating', 'z-score'],
+                pivot.table_rows(min_count, sort_by))
+
+    def a_submenu_e(self):
+        """Displays monthly and yearly review trends for a selected park."""
+        branch = TUI.validate_branch('Select one of the following branches: ', self.branch_names())
+        self.require_branch(branch)
+        TUI.print_trends(self.branches[branch])
+
+    def exit(self):
+        """Reports query cache statistics and exits the program."""
+        TUI.print_cache_stats(self.query_cache)
+        exit()
 
     def b_submenu_a(self):
         """Displays a pie chart of the most reviewed parks."""
+        self.require_all()
         data = Process.get_branches_reviews_count(self.branches)
         reviews_count = list(data.values())
         Visual.show_chart("pie", 'Most Reviewed Parks', labels=reviews_count, vals=reviews_count,
@@ -156,23 +326,57 @@ class Controller:
 
     def b_submenu_b(self):
         """Displays a bar chart of average scores per park."""
-        data = Process.get_avg_branches_rating(self.branches)
+        self.require_all()
+
+        if self.sample_size:
+            intervals = {branch: next(iter(self.branches[branch].rating_intervals('branch').values()), (0, 0, 0))
+                         for branch in self.branches}
+            Visual.show_chart("bar", self.approximate_title('Average Scores'),
+                              labels=[self.branches[branch].get_name() for branch in intervals],
+                              vals=[item[0] for item in intervals.values()],
+                              errors=[item[1] for item in intervals.values()])
+            if not TUI.validate_yes_no('Would you like to recompute this chart exactly? (Y/N)'):
+                return
+
+        data = Process.get_avg_branches_rating(self.exact_branches())
         Visual.show_chart("bar", 'Average Scores',
                           labels=[self.branches[branch].get_name() for branch in list(data.keys())],
                           vals=list(data.values()))
 
     def b_submenu_c(self):
         """Displays a bar chart ranking parks by nationality."""
-        branch = TUI.validate_branch('Please enter one of the following options:', self.branches)
-        data = self.branches[branch].top_locations
+        branch = TUI.validate_branch('Please enter one of the following options:', self.branch_names())
+        self.require_branch(branch)
+
+        if isinstance(self.branches[branch], SampledBranch):
+            intervals = self.branches[branch].rating_intervals('reviewer_location')
+            data = sorted(intervals.items(), key=lambda x: x[1][0], reverse=True)[:10]
+            Visual.show_chart("bar", self.approximate_title('Park Ranking by Nationality', branch),
+                              labels=[item[0] for item in data], vals=[item[1][0] for item in data],
+                              errors=[item[1][1] for item in data])
+            if not TUI.validate_yes_no('Would you like to recompute this chart exactly? (Y/N)'):
+                return
+
+        data = self.exact_branch(branch).top_locations
 
         Visual.show_chart("bar", 'Park Ranking by Nationality', labels=[item[0] for item in data],
                           vals=[item[1] for item in data])
 
     def b_submenu_d(self):
         """Displays a bar chart showing the most popular months by park."""
-        branch = TUI.validate_branch('Please enter one of the following options:', self.branches)
-        months, avg_rating = zip(*self.branches[branch].avg_popularity_by_month)
+        branch = TUI.validate_branch('Please enter one of the following options:', self.branch_names())
+        self.require_branch(branch)
+
+        if isinstance(self.branches[branch], SampledBranch):
+            intervals = self.branches[branch].rating_intervals('month')
+            data = [intervals.get(month, (0, float('nan'), 0)) for month in MONTHS]
+            Visual.show_chart('bar', self.approximate_title(
+                f'Most Popular Month by Park ({self.branches[branch].get_name()})', branch),
+                              labels=list(MONTHS), vals=[item[0] for item in data], errors=[item[1] for item in data])
+            if not TUI.validate_yes_no('Would you like to recompute this chart exactly? (Y/N)'):
+                return
+
+        months, avg_rating = zip(*self.exact_branch(branch).avg_popularity_by_month)
 
         Visual.show_chart('bar', f'Most Popular Month by Park ({self.branches[branch].get_name()})',
                           labels=list(months), vals=list(avg_rating))
@@ -210,6 +414,17 @@ class Controller:
                 else:
                     print('Input does not correspond with any option!')
 
+    def export(self) -> DataExporter:
+        """
+        Waits until all reviews have been loaded and returns an exporter for them.
+
+        In sampling mode the full dataset is loaded first, so that exports always contain every review.
+        """
+        self.require_all()
+        if self.sample_size:
+            TUI.print_message('Exports contain every review, so the full dataset is being loaded...')
+        return DataExporter(self.exact_branches())
+
     def c_submenu(self):
         """Displays the export data submenu."""
         options = Process.create_options([
@@ -220,9 +435,9 @@ class Controller:
         options['X'] = 'Go Back'
 
         actions = {
-            'A': lambda: DataExporter(self.branches).export_txt(),
-            'B': lambda: DataExporter(self.branches).export_csv(),
-            'C': lambda: DataExporter(self.branches).export_json(),
+            'A': lambda: self.export().export_txt(),
+            'B': lambda: self.export().export_csv(),
+            'C': lambda: self.export().export_json(),
             'X': lambda: None
         }
 
@@ -242,4 +457,17 @@ class Controller:
 
 
 if __name__ == '__main__':
-    Controller()
+    parser = argparse.ArgumentParser(description='Disneyland Reviews Analyser')
+    backend = parser.add_mutually_exclusive_group()
+    backend.add_argument('--sqlite', metavar='DATABASE', nargs='?', const='data/disneyland_reviews.db',
+                         help='store reviews in an SQLite database instead of memory '
+                              '(default: data/disneyland_reviews.db)')
+    backend.add_argument('--shared', metavar='PATH', nargs='?', const='data/disneyland_reviews.shm',
+                         help='share one parsed copy of the reviews with other sessions through a memory-mapped '
+                              'file (default: data/disneyland_reviews.shm)')
+    backend.add_argument('--sample', metavar='SIZE', type=int,
+                         help='only keep a random sample of SIZE reviews per park for fast, approximate results')
+    args = parser.parse_args()
+    if args.sample is not None and args.sample < 1:
+        parser.error('--sample must be at least 1')
+    Controller(args.sqlite, args.sample, args.shared)
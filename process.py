@@ -5,14 +5,30 @@ It receives the dataset and performs necessary operations to provide the desired
 in the required format. This includes data filtering, counting, and exporting.
 
 Functions:
-- Load and parse reviews from a CSV file.
+- Load and parse reviews from a CSV file, optionally in the background.
+- Draw a fixed-size random sample of reviews during a streaming read.
 - Perform operations on the dataset, such as filtering and counting.
+- Cache filter results for repeated queries.
+- Pivot average ratings by branch and reviewer location.
 - Export processed data in TXT, CSV, or JSON format.
 """
 
 import csv
-from typing import List, Dict, Union
-from exporter import Branch, Review
+import gc
+import io
+import math
+import mmap
+import os
+import random
+import sys
+import threading
+import time
+from collections import OrderedDict, Counter
+from itertools import groupby, starmap, compress
+from operator import itemgetter
+from typing import List, Dict, Union, Tuple, Optional, Iterator, Callable, Any
+import numpy as np
+from exporter import Branch, Review, SampledBranch, MISSING
 
 
 class Process:
@@ -32,6 +48,8 @@ class Process:
         """
         Reads review data from a CSV file and structures it into a dictionary of Branch objects.
 
+        Use ReviewLoader directly to load reviews in the background.
+
         Args:
             file_path (str): Path to the CSV file.
 
@@ -39,24 +57,35 @@ class Process:
             Dict[str, Branch]: A dictionary where keys are branch names and values are Branch objects.
         """
         print('Loading reviews...')
-        with open(file_path, encoding="utf-8") as f:
-            csvreader = csv.reader(f)
-            next(csvreader)  # Skip the header row
-
-            branches: Dict[str, Branch] = {}
+        loader = ReviewLoader(file_path)
+        gc_enabled = gc.isenabled()
+        gc.disable()  # The loaded rows cannot form reference cycles, so collecting during the load is wasted work
+        try:
+            loader.run()
+        finally:
+            if gc_enabled:
+                gc.enable()
+        loader.wait()
 
-            for review in csvreader:
-                review_id, rating, year_month, reviewer_location, branch = review
+        print('Loading finished!')
+        return loader.branches
 
-                if branch not in branches:
-                    branches[branch] = Branch(branch, [])
+    @staticmethod
+    def parse_year_month(year_month: str) -> Tuple[int, int]:
+        """
+        Parses a "YYYY-MM" timestamp into integer year and month keys.
 
-                branches[branch].reviews.append(
-                    Review(int(review_id), int(rating), year_month, reviewer_location, branch)
-                )
+        Args:
+            year_month (str): The timestamp to parse.
 
-        print('Loading finished!')
-        return branches
+        Returns:
+            Tuple[int, int]: The year and month, or (MISSING, MISSING) if the timestamp is missing, malformed or
+            outside the years 1 to 9999.
+        """
+        year, _, month = year_month.partition('-')
+        if not (year.isdigit() and month.isdigit() and 1 <= int(year) <= 9999 and 1 <= int(month) <= 12):
+            return MISSING, MISSING
+        return int(year), int(month)
 
     @staticmethod
     def count_reviews(branches: Dict[str, Branch]) -> int:
@@ -109,6 +138,9 @@ class Process:
         """
         Filters reviews based on specified criteria.
 
+        Review collections that provide their own filter method (such as SQLiteReviews) are filtered by it,
+        so the query is pushed down to the storage engine.
+
         Args:
             reviews (List[Review]): List of reviews to be filtered.
             filters (Dict[str, str]): A dictionary containing filter keys and values.
@@ -116,12 +148,18 @@ class Process:
         Returns:
             List[Review]: A list of reviews that match the specified filters.
         """
+        if hasattr(reviews, 'filter'):
+            return reviews.filter(filters)
+
         filtered_reviews = []
+        year = None
+        if 'year' in filters:
+            year = int(filters['year']) if filters['year'].isdigit() else MISSING
 
         for review in reviews:
-            if 'year' in filters and not review.year_month.startswith(filters['year']):
+            if year is not None and review.year != year:
                 continue
-            if all(Process.trans_str(vars(review)[key]) == Process.trans_str(value)
+            if all(Process.trans_str(getattr(review, key)) == Process.trans_str(value)
                    for key, value in filters.items() if key != 'year'):
                 filtered_reviews.append(review)
 
@@ -151,4 +189,811 @@ class Process:
         Returns:
             Dict[str, float]: A dictionary where keys are branch names and values are average ratings.
         """
-        return {branch_name: branch.avg_rating for branch_name, branch in branches.items()}
\ No newline at end of file
+        return {branch_name: branch.avg_rating for branch_name, branch in branches.items()}
+
+
+class ValidationReport:
+    """
+    Counts the rows flagged or dropped while loading reviews, by reason.
+
+    Attributes:
+        dropped (Dict[str, int]): Number of rows left out of the dataset, by reason.
+        flagged (Dict[str, int]): Number of rows kept despite an issue, by reason.
+    """
+
+    MALFORMED_ROW = 'Malformed row'
+    INVALID_ID = 'Invalid review ID'
+    INVALID_RATING = 'Invalid rating'
+    DUPLICATE_ID = 'Duplicate review ID'
+    MISSING_DATE = 'Missing date'
+    MALFORMED_DATE = 'Malformed date'
+
+    def __init__(self, dropped: Optional[Dict[str, int]] = None, flagged: Optional[Dict[str, int]] = None) -> None:
+        self.dropped: Dict[str, int] = dict(dropped or {})
+        self.flagged: Dict[str, int] = dict(flagged or {})
+
+    def drop(self, reason: str, count: int = 1) -> None:
+        """Records rows dropped for a reason."""
+        if count:
+            self.dropped[reason] = self.dropped.get(reason, 0) + count
+
+    def flag(self, reason: str, count: int = 1) -> None:
+        """Records rows flagged for a reason."""
+        if count:
+            self.flagged[reason] = self.flagged.get(reason, 0) + count
+
+    @property
+    def total_dropped(self) -> int:
+        """Returns the total number of dropped rows."""
+        return sum(self.dropped.values())
+
+    def __bool__(self) -> bool:
+        return bool(self.dropped or self.flagged)
+
+
+class _Memo(dict):
+    """A dictionary that computes and stores missing values, used to convert repeated CSV fields once."""
+
+    def __init__(self, convert: Callable[[bytes], Any]) -> None:
+        super().__init__()
+        self.convert = convert
+
+    def __missing__(self, key: bytes) -> Any:
+        value = self[key] = self.convert(key)
+        return value
+
+
+class ReviewLoader:
+    """
+    Loads reviews from a CSV file, either synchronously or in a background thread.
+
+    Branches become available progressively: a branch is ready once the loader has moved past its
+    block of rows, and all branches are ready when loading finishes. If a ready branch reappears later
+    in the file it is marked as loading again until the end of the file.
+
+    The file is memory-mapped and parsed by a tokenizer specialised for the five-column review schema,
+    falling back to csv.reader only for chunks containing quoted fields. Reviewer location and branch
+    strings are interned so that repeated values share a single object.
+
+    Rows are validated while they are parsed: malformed rows, invalid IDs and invalid ratings are dropped,
+    duplicate review IDs are dropped (or flagged), and missing or malformed dates are flagged and stored as
+    MISSING. The outcome is recorded in the report.
+
+    Attributes:
+        file_path (str): Path to the CSV file.
+        deduplicate (bool): Whether reviews with an already loaded ID are dropped.
+        report (ValidationReport): Rows flagged or dropped while loading.
+        branches (Dict[str, Branch]): Branches discovered so far, filled in while loading.
+        total_bytes (int): Size of the file in bytes.
+        bytes_read (int): Number of bytes read so far.
+        rows_read (int): Number of reviews read so far.
+        done (bool): Whether loading has finished.
+        error (Optional[Exception]): The error that stopped loading, if any.
+    """
+
+    CHUNK_SIZE = 1 << 20
+    """Approximate number of bytes parsed at a time."""
+
+    MAX_REVIEW_ID = (1 << 63) - 1
+    """Largest valid review ID, the maximum of the 64-bit integers used by SQLite and shared storage."""
+
+    def __init__(self, file_path: str, deduplicate: bool = True) -> None:
+        """
+        Initializes the loader without reading the file.
+
+        Args:
+            file_path (str): Path to the CSV file.
+            deduplicate (bool, optional): Drop reviews whose ID was already loaded. Defaults to True.
+        """
+        self.file_path = file_path
+        self.deduplicate = deduplicate
+        self.report = ValidationReport()
+        self.branches: Dict[str, Branch] = {}
+        self.total_bytes = os.path.getsize(file_path)
+        self.bytes_read = 0
+        self.rows_read = 0
+        self.done = False
+        self.error: Optional[Exception] = None
+
+        self._ready: set = set()
+        self._seen: set = set()
+        self._condition = threading.Condition()
+        self._started = time.perf_counter()
+        self._finished: Optional[float] = None
+
+    @property
+    def source(self) -> str:
+        """Returns a signature of the CSV file, used to detect whether data derived from it is up to date."""
+        stat = os.stat(self.file_path)
+        return f'{os.path.abspath(self.file_path)}:{stat.st_size}:{stat.st_mtime_ns}'
+
+    def start(self) -> None:
+        """Starts loading in a background thread."""
+        threading.Thread(target=self.run, name='ReviewLoader', daemon=True).start()
+
+    def run(self) -> None:
+        """Loads the file in the current thread."""
+        self._started = time.perf_counter()
+        try:
+            with open(self.file_path, 'rb') as f:
+                if self.total_bytes:
+                    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                        self._parse(mm)
+        except Exception as e:
+            self.error = e
+        finally:
+            self._finish()
+
+    def _finish(self) -> None:
+        """Marks loading as finished and every branch as ready."""
+        with self._condition:
+            self._ready.update(self.branches)
+            self.done = True
+            self._finished = time.perf_counter()
+            self._condition.notify_all()
+
+    def _parse(self, mm: mmap.mmap) -> None:
+        """Parses the memory-mapped file and stores its reviews branch by branch."""
+        current = None
+        for branch, rows in self._read_groups(mm):
+            if branch != current:
+                current = self._switch_branch(current, branch)
+            self.rows_read += self._store(self.branches[current], rows)
+
+    def _store(self, branch: Branch, rows: Iterator[tuple]) -> int:
+        """
+        Stores parsed rows in a branch.
+
+        Args:
+            branch (Branch): The branch the rows belong to.
+            rows (Iterator[tuple]): Review constructor arguments, one tuple per review.
+
+        Returns:
+            int: The number of reviews stored.
+        """
+        count = len(branch.reviews)
+        branch.reviews.extend(starmap(Review, rows))
+        return len(branch.reviews) - count
+
+    def _new_branch(self, branch: str) -> Branch:
+        """Creates an empty branch to be filled while loading."""
+        return Branch(branch, [])
+
+    def _read_groups(self, mm: mmap.mmap) -> Iterator[Tuple[str, Iterator[tuple]]]:
+        """Parses the memory-mapped file chunk by chunk, yielding consecutive rows of the same branch."""
+        ratings = _Memo(self._parse_rating)
+        dates = _Memo(self._parse_date)
+        strings = _Memo(lambda value: sys.intern(value.decode('utf-8')))
+
+        start = mm.find(b'\n') + 1 or len(mm)  # Skip the header row
+        self.bytes_read = start
+
+        for chunk, end in self._chunks(mm, start):
+            columns = self._tokenize(chunk)
+            if columns:
+                review_ids, rating_col, date_col, location_col, branch_col = columns
+                review_ids = self._parse_ids(review_ids)
+                rating_col = list(map(ratings.__getitem__, rating_col))
+                years, months, date_issues, raw_dates = zip(*map(dates.__getitem__, date_col))
+                rows = zip(review_ids, rating_col, years, months,
+                           map(strings.__getitem__, location_col), map(strings.__getitem__, branch_col), raw_dates)
+
+                keep = self._select_valid(review_ids, rating_col)
+                if keep is not None:
+                    rows = compress(rows, keep)
+                    date_issues = compress(date_issues, keep)
+                for issue, count in Counter(date_issues).items():
+                    if issue:
+                        self.report.flag(issue, count)
+
+                yield from groupby(rows, key=itemgetter(5))
+            self.bytes_read = end
+
+    @staticmethod
+    def _parse_ids(review_ids: List[bytes]) -> List[Optional[int]]:
+        """
+        Converts a column of review IDs to integers, using None for invalid IDs.
+
+        An ID is valid if it consists of ASCII digits, optionally surrounded by whitespace, and fits in a signed
+        64-bit integer as every storage engine requires. The whole column is checked at once and only converted
+        row by row if some ID is not plain digits or is too large.
+        """
+        if b''.join(review_ids).isdigit() and b'' not in review_ids:
+            parsed = list(map(int, review_ids))
+            if max(parsed) <= ReviewLoader.MAX_REVIEW_ID:
+                return parsed
+        return [int(review_id) if review_id.strip().isdigit() and int(review_id) <= ReviewLoader.MAX_REVIEW_ID
+                else None for review_id in review_ids]
+
+    @staticmethod
+    def _parse_rating(rating: bytes) -> Optional[int]:
+        """Converts a rating to an integer, or None if it is not between 1 and 5."""
+        rating = rating.strip()
+        return int(rating) if rating.isdigit() and 1 <= int(rating) <= 5 else None
+
+    @staticmethod
+    def _parse_date(year_month: bytes) -> Tuple[int, int, Optional[str], Optional[str]]:
+        """
+        Parses a timestamp into its year and month, the validation issue it raises, if any, and the original
+        timestamp if it cannot be rebuilt from the year and month.
+        """
+        year_month = year_month.decode('utf-8')
+        year, month = Process.parse_year_month(year_month)
+        raw_date = year_month if year_month != Review.format_date(year, month) else None
+        if year != MISSING:
+            return year, month, None, raw_date
+        issue = ValidationReport.MISSING_DATE if year_month == 'missing' else ValidationReport.MALFORMED_DATE
+        return year, month, issue, raw_date
+
+    def _select_valid(self, review_ids: List[Optional[int]], ratings: List[Optional[int]]) -> Optional[List[bool]]:
+        """
+        Validates the IDs and ratings of a chunk of rows and checks the IDs for duplicates.
+
+        Invalid rows are recorded in the report and always dropped; duplicates are handled by _deduplicate.
+
+        Args:
+            review_ids (List[Optional[int]]): Parsed review IDs, None where invalid.
+            ratings (List[Optional[int]]): Parsed ratings, None where invalid.
+
+        Returns:
+            Optional[List[bool]]: Which rows to keep, or None if every row is kept.
+        """
+        keep = None
+        if None in review_ids or None in ratings:
+            keep = [review_id is not None and rating is not None for review_id, rating in zip(review_ids, ratings)]
+            invalid_ids = review_ids.count(None)
+            self.report.drop(ValidationReport.INVALID_ID, invalid_ids)
+            self.report.drop(ValidationReport.INVALID_RATING, keep.count(False) - invalid_ids)
+
+        return self._deduplicate(review_ids, keep)
+
+    def _deduplicate(self, review_ids: List[Optional[int]], keep: Optional[List[bool]]) -> Optional[List[bool]]:
+        """
+        Checks the valid IDs of a chunk of rows against every review ID loaded so far.
+
+        Duplicates of an earlier review ID are dropped if deduplicate is set, and flagged otherwise. The loaded
+        IDs are kept in memory; loaders for data larger than memory override this.
+
+        Args:
+            review_ids (List[Optional[int]]): Parsed review IDs, None where invalid.
+            keep (Optional[List[bool]]): Which rows passed validation, or None if every row did.
+
+        Returns:
+            Optional[List[bool]]: Which rows to keep, or None if every row is kept.
+        """
+        candidates = review_ids if keep is None else list(compress(review_ids, keep))
+        unique = set(candidates)
+        if len(unique) == len(candidates) and self._seen.isdisjoint(unique):
+            self._seen |= unique
+            return keep
+
+        keep = keep or [True] * len(review_ids)
+        duplicates = 0
+        for i, review_id in enumerate(review_ids):
+            if not keep[i]:
+                continue
+            if review_id in self._seen:
+                duplicates += 1
+                keep[i] = not self.deduplicate
+            else:
+                self._seen.add(review_id)
+
+        if self.deduplicate:
+            self.report.drop(ValidationReport.DUPLICATE_ID, duplicates)
+        else:
+            self.report.flag(ValidationReport.DUPLICATE_ID, duplicates)
+        return keep
+
+    def _chunks(self, mm: mmap.mmap, start: int) -> Iterator[Tuple[bytes, int]]:
+        """Yields chunks of whole rows together with the offset at which each chunk ends."""
+        size = len(mm)
+        while start < size:
+            end = size if start + self.CHUNK_SIZE >= size else mm.find(b'\n', start + self.CHUNK_SIZE) + 1 or size
+            chunk = mm[start:end]
+            while chunk.count(b'"') % 2 and end < size:  # Never split a quoted field
+                end = mm.find(b'\n', end) + 1 or size
+                chunk = mm[start:end]
+            yield chunk, end
+            start = end
+
+    def _tokenize(self, chunk: bytes) -> Optional[Tuple[List[bytes], ...]]:
+        """
+        Splits a chunk of rows into its five columns.
+
+        Chunks without quotes are split with a single bytes operation; anything else falls back to csv.reader.
+        Rows that do not have exactly five fields are dropped and recorded in the report.
+
+        Args:
+            chunk (bytes): Whole rows of the CSV file.
+
+        Returns:
+            Optional[Tuple[List[bytes], ...]]: The five columns, or None if the chunk has no valid rows.
+        """
+        chunk = chunk.replace(b'\r\n', b'\n').rstrip(b'\n')
+        if not chunk:
+            return None
+
+        if b'"' not in chunk:
+            lines = chunk.count(b'\n') + 1
+            fields = chunk.replace(b'\n', b',\n,').split(b',')
+            if len(fields) == 6 * lines - 1 and fields[5::6].count(b'\n') == lines - 1:
+                return tuple(fields[i::6] for i in range(5))
+
+        rows = [row for row in csv.reader(io.StringIO(chunk.decode('utf-8'), newline='')) if row]
+        valid_rows = [row for row in rows if len(row) == 5]
+        self.report.drop(ValidationReport.MALFORMED_ROW, len(rows) - len(valid_rows))
+        rows = valid_rows
+        return tuple([field.encode('utf-8') for field in column] for column in zip(*rows))
+
+    def _switch_branch(self, previous: Optional[str], branch: str) -> str:
+        """Marks the previous branch as ready and prepares the next branch for new reviews."""
+        with self._condition:
+            if previous is not None:
+                self._ready.add(previous)
+            if branch not in self.branches:
+                self.branches[branch] = self._new_branch(branch)
+            elif branch in self._ready:
+                self._ready.discard(branch)
+                self.branches[branch].mark_changed()
+            self._condition.notify_all()
+        return branch
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """
+        Waits until loading has finished.
+
+        Args:
+            timeout (Optional[float], optional): Maximum number of seconds to wait. Defaults to None (no limit).
+
+        Returns:
+            bool: True if loading has finished, False if the timeout expired.
+
+        Raises:
+            Exception: The error that stopped loading, if any.
+        """
+        return self._wait_for(lambda: self.done, timeout)
+
+    def wait_for_branch(self, branch: str, timeout: Optional[float] = None) -> bool:
+        """
+        Waits until all reviews of a branch have been loaded.
+
+        Args:
+            branch (str): The branch name.
+            timeout (Optional[float], optional): Maximum number of seconds to wait. Defaults to None (no limit).
+
+        Returns:
+            bool: True if the branch is ready, False if the timeout expired.
+
+        Raises:
+            Exception: The error that stopped loading, if any.
+        """
+        return self._wait_for(lambda: self.done or branch in self._ready, timeout)
+
+    def wait_for_any_branch(self, timeout: Optional[float] = None) -> bool:
+        """
+        Waits until at least one branch has been discovered.
+
+        Args:
+            timeout (Optional[float], optional): Maximum number of seconds to wait. Defaults to None (no limit).
+
+        Returns:
+            bool: True if a branch has been discovered or loading has finished, False if the timeout expired.
+
+        Raises:
+            Exception: The error that stopped loading, if any.
+        """
+        return self._wait_for(lambda: self.done or bool(self.branches), timeout)
+
+    def _wait_for(self, predicate, timeout: Optional[float]) -> bool:
+        """Waits for a loading condition and re-raises any loading error."""
+        with self._condition:
+            result = self._condition.wait_for(predicate, timeout)
+        if self.error:
+            raise self.error
+        return result
+
+    def is_branch_ready(self, branch: str) -> bool:
+        """Returns whether all reviews of a branch have been loaded."""
+        with self._condition:
+            return self.done or branch in self._ready
+
+    def branch_names(self) -> List[str]:
+        """Returns the names of the branches discovered so far."""
+        with self._condition:
+            return list(self.branches.keys())
+
+    @property
+    def elapsed(self) -> float:
+        """Returns the number of seconds spent loading."""
+        return (self._finished or time.perf_counter()) - self._started
+
+    @property
+    def bytes_per_second(self) -> float:
+        """Returns the average loading speed in bytes per second."""
+        return self.bytes_read / self.elapsed if self.elapsed > 0 else 0.0
+
+    @property
+    def rows_per_second(self) -> float:
+        """Returns the average loading speed in reviews per second."""
+        return self.rows_read / self.elapsed if self.elapsed > 0 else 0.0
+
+    @property
+    def eta(self) -> Optional[float]:
+        """Returns the estimated number of seconds until loading finishes, or None if unknown."""
+        if self.done:
+            return 0.0
+        speed = self.bytes_per_second
+        return (self.total_bytes - self.bytes_read) / speed if speed > 0 else None
+
+
+class _Reservoir:
+    """A fixed-size uniform random sample of a stream of rows, maintained with Algorithm L."""
+
+    def __init__(self, size: int, rng: random.Random) -> None:
+        self.size = size
+        self.rng = rng
+        self.items: List[tuple] = []
+        self.ids: set = set()
+        self.seen = 0
+        self.weight = 1.0
+        self.next = 0
+
+    def _advance(self) -> None:
+        """Draws the index of the next row to be sampled."""
+        self.weight *= math.exp(math.log(self.rng.random() or 1e-300) / self.size)
+        skip = int(math.log(self.rng.random() or 1e-300) / math.log1p(-self.weight)) if self.weight < 1 else 0
+        self.next += skip + 1
+
+    def extend(self, rows: List[tuple]) -> None:
+        """Offers a batch of rows to the sample."""
+        start = 0
+        if len(self.items) < self.size:
+            start = self.size - len(self.items)
+            self.items.extend(rows[:start])
+            self.ids.update(row[0] for row in rows[:start])
+            if len(self.items) == self.size:
+                self.next = self.size - 1
+                self._advance()
+
+        end = self.seen + len(rows)
+        while len(self.items) == self.size and self.next < end:
+            index, row = self.rng.randrange(self.size), rows[self.next - self.seen]
+            self.ids.discard(self.items[index][0])
+            self.ids.add(row[0])
+            self.items[index] = row
+            self._advance()
+        self.seen = end
+
+
+class SampleLoader(ReviewLoader):
+    """
+    Builds a fixed-size random sample of the reviews in a CSV file during a single streaming read.
+
+    Only the sampled reviews are kept in memory, so analyses and charts on the sample take a bounded time
+    regardless of the size of the file. For the same reason, review IDs are only checked for duplicates against
+    the current samples: the samples never hold two reviews with the same ID, but a duplicate of a review that
+    was not sampled goes undetected and is counted in the population. With stratified sampling, each branch
+    gets its own sample of the given size; otherwise one sample is drawn across all branches. The loaded
+    branches are SampledBranch objects that also know the total number of reviews they were sampled from.
+
+    Attributes:
+        sample_size (int): Maximum number of sampled reviews per branch (stratified) or in total.
+        stratified (bool): Whether each branch is sampled separately.
+    """
+
+    def __init__(self, file_path: str, sample_size: int, stratified: bool = True, seed: Optional[int] = None,
+                 deduplicate: bool = True) -> None:
+        """
+        Initializes the loader without reading the file.
+
+        Args:
+            file_path (str): Path to the CSV file.
+            sample_size (int): Maximum number of sampled reviews per branch (stratified) or in total.
+            stratified (bool, optional): Sample each branch separately. Defaults to True.
+            seed (Optional[int], optional): Seed for the random number generator. Defaults to None.
+            deduplicate (bool, optional): Drop reviews whose ID was already loaded. Defaults to True.
+
+        Raises:
+            ValueError: If sample_size is smaller than 1.
+        """
+        if sample_size < 1:
+            raise ValueError('Sample size must be greater than or equal to 1!')
+
+        super().__init__(file_path, deduplicate)
+        self.sample_size = sample_size
+        self.stratified = stratified
+        self._rng = random.Random(seed)
+        self._reservoirs: Dict[str, _Reservoir] = {}
+
+    def _new_branch(self, branch: str) -> Branch:
+        """Creates an empty sampled branch."""
+        return SampledBranch(branch, [])
+
+    def _deduplicate(self, review_ids: List[Optional[int]], keep: Optional[List[bool]]) -> Optional[List[bool]]:
+        """Checks the valid IDs of a chunk of rows against each other and the IDs in the current samples."""
+        candidates = review_ids if keep is None else list(compress(review_ids, keep))
+        unique = set(candidates)
+        if len(unique) == len(candidates) and all(reservoir.ids.isdisjoint(unique)
+                                                  for reservoir in self._reservoirs.values()):
+            return keep
+
+        keep = keep or [True] * len(review_ids)
+        chunk_ids = set()
+        duplicates = 0
+        for i, review_id in enumerate(review_ids):
+            if not keep[i]:
+                continue
+            if review_id in chunk_ids or any(review_id in reservoir.ids for reservoir in self._reservoirs.values()):
+                duplicates += 1
+                keep[i] = not self.deduplicate
+            else:
+                chunk_ids.add(review_id)
+
+        if self.deduplicate:
+            self.report.drop(ValidationReport.DUPLICATE_ID, duplicates)
+        else:
+            self.report.flag(ValidationReport.DUPLICATE_ID, duplicates)
+        return keep
+
+    def _store(self, branch: Branch, rows: Iterator[tuple]) -> int:
+        """Offers parsed rows to the sample of their branch and counts them in its population."""
+        key = branch.branch if self.stratified else ''
+        if key not in self._reservoirs:
+            self._reservoirs[key] = _Reservoir(self.sample_size, self._rng)
+
+        rows = list(rows)
+        self._reservoirs[key].extend(rows)
+        branch.population += len(rows)
+        return len(rows)
+
+    def _finish(self) -> None:
+        """Moves the sampled rows into their branches before marking loading as finished."""
+        for reservoir in self._reservoirs.values():
+            for row in reservoir.items:
+                self.branches[row[5]].reviews.append(Review(*row))
+            reservoir.ids.clear()
+        self._reservoirs.clear()
+        super()._finish()
+
+    def _switch_branch(self, previous: Optional[str], branch: str) -> str:
+        """Keeps a branch loading until the sample is complete, as its reviews are only added at the end."""
+        with self._condition:
+            self.branches.setdefault(branch, self._new_branch(branch))
+            self._condition.notify_all()
+        return branch
+
+
+class RatingPivot:
+    """
+    A branch by reviewer location matrix of review counts and average ratings.
+
+    The pivot is built from each branch's cached location totals, so recomputing it only costs work
+    proportional to the number of branches and locations, not the number of reviews.
+
+    Attributes:
+        branches (List[str]): Branch names, one per matrix row.
+        locations (List[str]): Reviewer locations, one per matrix column, sorted alphabetically.
+        counts (np.ndarray): Number of reviews per branch and location.
+        averages (np.ndarray): Average rating per branch and location (NaN where there are no reviews).
+        branch_averages (np.ndarray): Average rating per branch.
+        z_scores (np.ndarray): How many standard errors each location's average lies from its branch average.
+    """
+
+    SORT_KEYS = ('count', 'average', 'significance', 'location')
+
+    def __init__(self, branches: Dict[str, Branch]) -> None:
+        """
+        Builds the pivot.
+
+        Args:
+            branches (Dict[str, Branch]): A dictionary of Branch objects.
+        """
+        self.branches = list(branches)
+        totals = [branch.location_totals() for branch in branches.values()]
+        self.locations = sorted(set().union(*(locations for locations, *_ in totals)))
+        index = {location: i for i, location in enumerate(self.locations)}
+
+        shape = (len(self.branches), len(self.locations))
+        self.counts = np.zeros(shape, dtype=np.int64)
+        sums = np.zeros(shape)
+        squares = np.zeros(shape)
+        for row, (locations, counts, location_sums, location_squares) in enumerate(totals):
+            columns = np.fromiter(map(index.__getitem__, locations), dtype=np.intp, count=len(locations))
+            self.counts[row, columns] = counts
+            sums[row, columns] = location_sums
+            squares[row, columns] = location_squares
+
+        branch_counts = self.counts.sum(axis=1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            self.averages = sums / self.counts
+            self.branch_averages = sums.sum(axis=1) / branch_counts
+            branch_deviations = np.sqrt(np.maximum(squares.sum(axis=1) - branch_counts * self.branch_averages ** 2, 0)
+                                        / (branch_counts - 1))
+            self.z_scores = ((self.averages - self.branch_averages[:, None])
+                             / (branch_deviations[:, None] / np.sqrt(self.counts)))
+
+    def matrix(self, min_count: int = 1, sort_by: str = 'count') -> Tuple[List[str], np.ndarray, np.ndarray]:
+        """
+        Returns the locations with enough reviews in at least one branch, sorted.
+
+        Args:
+            min_count (int, optional): Minimum number of reviews for a cell to be shown. Defaults to 1.
+            sort_by (str, optional): One of SORT_KEYS: total review count, overall average rating, largest
+                absolute z-score (all descending) or location name. Defaults to 'count'.
+
+        Returns:
+            Tuple[List[str], np.ndarray, np.ndarray]: The locations, and the average ratings and review counts
+            with one row per branch and one column per location. Cells below min_count are NaN and 0.
+
+        Raises:
+            ValueError: If sort_by is not one of SORT_KEYS.
+        """
+        if sort_by not in self.SORT_KEYS:
+            raise ValueError(f"Invalid sort key '{sort_by}'. Supported keys are: {list(self.SORT_KEYS)}")
+
+        shown = self.counts >= max(min_count, 1)
+        counts = np.where(shown, self.counts, 0)
+        averages = np.where(shown, self.averages, np.nan)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            keys = {
+                'count': -counts.sum(axis=0),
+                'average': -np.nansum(averages * counts, axis=0) / counts.sum(axis=0),
+                'significance': -np.nanmax(np.where(shown, np.abs(self.z_scores), -np.inf), axis=0),
+                'location': np.arange(len(self.locations)),
+            }
+        columns = np.flatnonzero(shown.any(axis=0))
+        columns = columns[np.argsort(keys[sort_by][columns], kind='stable')]
+
+        return [self.locations[column] for column in columns], averages[:, columns], counts[:, columns]
+
+    def ranking(self, min_count: int = 1, limit: int = 10) -> List[Tuple[str, str, int, float, float, float]]:
+        """
+        Ranks branch and location pairs by how far their average rating lies from the branch average.
+
+        Args:
+            min_count (int, optional): Minimum number of reviews for a pair to be ranked. Defaults to 1.
+            limit (int, optional): Maximum number of pairs returned. Defaults to 10.
+
+        Returns:
+            List[Tuple[str, str, int, float, float, float]]: Branch, location, review count, average rating,
+            branch average rating and z-score of each pair, most significant first.
+        """
+        eligible = (self.counts >= max(min_count, 1)) & np.isfinite(self.z_scores)
+        rows, columns = np.nonzero(eligible)
+        order = np.argsort(-np.abs(self.z_scores[rows, columns]), kind='stable')[:limit]
+
+        return [(self.branches[row], self.locations[column], int(self.counts[row, column]),
+                 round(float(self.averages[row, column]), 1), round(float(self.branch_averages[row]), 1),
+                 round(float(self.z_scores[row, column]), 2))
+                for row, column in zip(rows[order].tolist(), columns[order].tolist())]
+
+    def table_rows(self, min_count: int = 1, sort_by: str = 'count') -> List[List[Union[str, int, float]]]:
+        """
+        Returns the pivot in long format: one row per branch and location with enough reviews.
+
+        Args:
+            min_count (int, optional): Minimum number of reviews for a cell to be included. Defaults to 1.
+            sort_by (str, optional): One of SORT_KEYS, applied to the locations. Defaults to 'count'.
+
+        Returns:
+            List[List[Union[str, int, float]]]: Branch, location, review count, average rating and z-score.
+        """
+        locations, averages, counts = self.matrix(min_count, sort_by)
+        column_index = {location: i for i, location in enumerate(self.locations)}
+        return [[branch, location, int(counts[row, column]), round(float(averages[row, column]), 1),
+                 round(float(self.z_scores[row, column_index[location]]), 2)]
+                for column, location in enumerate(locations)
+                for row, branch in enumerate(self.branches) if counts[row, column] > 0]
+
+
+class QueryCache:
+    """
+    A bounded LRU cache for filtered review queries.
+
+    Results are keyed by branch and a normalized set of filters, so queries that differ only in
+    letter case, spacing or filter order share an entry. Entries are tied to the kind of branch, so that a
+    sample and the full data never share results, and to its version and number of reviews, so changes to
+    the underlying data are never served from the cache. Entries for an older version of a branch are removed
+    as soon as a result for its current version is stored.
+
+    Attributes:
+        max_entries (int): Maximum number of cached results.
+        max_rows (int): Maximum total number of reviews held across all cached results.
+        hits (int): Number of queries answered from the cache.
+        misses (int): Number of queries that had to scan the reviews.
+    """
+
+    def __init__(self, max_entries: int = 128, max_rows: int = 1_000_000) -> None:
+        """
+        Initializes an empty cache.
+
+        Args:
+            max_entries (int, optional): Maximum number of cached results. Defaults to 128.
+            max_rows (int, optional): Maximum total number of cached reviews. Defaults to 1,000,000.
+
+        Raises:
+            ValueError: If either bound is smaller than 1.
+        """
+        if max_entries < 1 or max_rows < 1:
+            raise ValueError('Cache bounds must be greater than or equal to 1!')
+
+        self.max_entries = max_entries
+        self.max_rows = max_rows
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[tuple, List[Review]] = OrderedDict()
+        self._rows = 0
+
+    @staticmethod
+    def make_key(branch: Branch, filters: Dict[str, str]) -> tuple:
+        """
+        Builds a cache key from a branch and a set of filters.
+
+        Args:
+            branch (Branch): The branch being queried.
+            filters (Dict[str, str]): A dictionary containing filter keys and values.
+
+        Returns:
+            tuple: A hashable key that is independent of filter order and formatting.
+        """
+        normalized = tuple(sorted((key, Process.trans_str(value)) for key, value in filters.items()))
+        return branch.branch, type(branch).__name__, branch.version, len(branch.reviews), normalized
+
+    def filter(self, branch: Branch, filters: Dict[str, str]) -> List[Review]:
+        """
+        Returns the reviews of a branch matching the filters, using a cached result when available.
+
+        Args:
+            branch (Branch): The branch to query.
+            filters (Dict[str, str]): A dictionary containing filter keys and values.
+
+        Returns:
+            List[Review]: A list of reviews that match the specified filters.
+        """
+        key = self.make_key(branch, filters)
+        result = self._entries.get(key)
+
+        if result is not None:
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return list(result)
+
+        self.misses += 1
+        result = Process.filter_reviews(branch.reviews, filters)
+        if len(result) <= self.max_rows:
+            self._drop_stale(key)
+            self._entries[key] = result
+            self._rows += len(result)
+            self._evict()
+        return list(result)
+
+    def invalidate(self, branch_name: Optional[str] = None) -> None:
+        """
+        Removes cached results.
+
+        Args:
+            branch_name (Optional[str], optional): Only remove results for this branch. Defaults to None (all).
+        """
+        for key in [key for key in self._entries if branch_name is None or key[0] == branch_name]:
+            self._rows -= len(self._entries.pop(key))
+
+    def _drop_stale(self, key: tuple) -> None:
+        """Removes results for the same branch as a key that were computed from a different version of it."""
+        for stale in [other for other in self._entries if other[:2] == key[:2] and other[2:4] != key[2:4]]:
+            self._rows -= len(self._entries.pop(stale))
+
+    def _evict(self) -> None:
+        """Removes least recently used results until the cache is within its bounds."""
+        while len(self._entries) > self.max_entries or self._rows > self.max_rows:
+            _, result = self._entries.popitem(last=False)
+            self._rows -= len(result)
+
+    @property
+    def hit_rate(self) -> float:
+        """Returns the fraction of queries answered from the cache."""
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -0,0 +1,381 @@
+"""
+This module shares one parsed copy of the review data between several program sessions.
+
+The first session parses the CSV file and publishes the reviews as compact columns in a memory-mapped
+file. Later sessions map the same file read-only and use its columns directly, so they start instantly
+and all sessions together hold a single copy of the dataset in memory.
+
+Functions:
+- Publish parsed reviews as a columnar, memory-mapped dataset.
+- Attach to a published dataset without copying or parsing it.
+- Answer branch queries and aggregates directly on the shared columns.
+"""
+
+import hashlib
+import json
+import mmap
+import os
+from array import array
+from typing import List, Dict, Tuple, Iterator, Optional
+import numpy as np
+from exporter import Branch, Review, MISSING
+from process import Process, ReviewLoader, ValidationReport
+
+MAGIC = b'REVSHM02'
+"""Identifies a shared review dataset file and its format version."""
+
+COLUMNS = (('review_id', 'q', '<i8'), ('rating', 'b', 'i1'), ('year', 'h', '<i2'), ('month', 'b', 'i1'),
+           ('location', 'i', '<i4'))
+"""Name, array typecode and file dtype of every shared column."""
+
+ALIGNMENT = 64
+
+
+class SharedDataset:
+    """
+    A read-only, memory-mapped columnar review dataset.
+
+    Reviews are stored grouped by branch, so each branch is a contiguous range of rows.
+
+    Attributes:
+        path (str): Path to the dataset file.
+        header (dict): Metadata: source signature, branch row ranges, locations, raw timestamps and
+            validation report.
+        columns (Dict[str, np.ndarray]): Read-only views of the review columns.
+        locations (List[str]): Reviewer locations, indexed by the location column.
+        raw_dates (Dict[int, str]): Original timestamps of the rows whose timestamp cannot be rebuilt from
+            the year and month columns.
+    """
+
+    def __init__(self, path: str) -> None:
+        """
+        Maps a published dataset file.
+
+        Args:
+            path (str): Path to the dataset file.
+
+        Raises:
+            ValueError: If the file is not a shared review dataset.
+        """
+        self.path = path
+        with open(path, 'rb') as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if self._mm[:len(MAGIC)] != MAGIC:
+            raise ValueError(f'{path} is not a shared review dataset!')
+        header_length = int.from_bytes(self._mm[len(MAGIC):len(MAGIC) + 8], 'little')
+        self.header = json.loads(self._mm[len(MAGIC) + 8:len(MAGIC) + 8 + header_length])
+
+        self.columns = {name: np.frombuffer(self._mm, dtype=dtype, count=self.header['rows'], offset=offset)
+                        for name, (dtype, offset) in self.header['columns'].items()}
+        self.locations: List[str] = self.header['locations']
+        self.raw_dates = {int(row): raw_date for row, raw_date in self.header['raw_dates'].items()}
+
+    @staticmethod
+    def publish(path: str, source: str, branches: Dict[str, Dict[str, array]], locations: List[str],
+                raw_dates: Dict[str, Dict[int, str]], report: ValidationReport) -> None:
+        """
+        Writes a dataset file, replacing any previous version atomically.
+
+        Args:
+            path (str): Path to the dataset file.
+            source (str): Signature of the data the columns were parsed from.
+            branches (Dict[str, Dict[str, array]]): Columns of every branch, in branch order.
+            locations (List[str]): Reviewer locations, indexed by the location column.
+            raw_dates (Dict[str, Dict[int, str]]): Original timestamps that differ from the year and month columns,
+                by branch and row within the branch.
+            report (ValidationReport): Rows flagged or dropped while parsing.
+        """
+        ranges, rows_raw_dates, start = [], {}, 0
+        for branch, columns in branches.items():
+            stop = start + len(columns['review_id'])
+            ranges.append([branch, start, stop])
+            rows_raw_dates.update((start + row, raw_date) for row, raw_date in raw_dates.get(branch, {}).items())
+            start = stop
+
+        header = {'source': source, 'rows': start, 'branches': ranges, 'locations': locations,
+                  'raw_dates': rows_raw_dates, 'report': {'dropped': report.dropped, 'flagged': report.flagged},
+                  'columns': {}}
+
+        # Column offsets depend on the header length, so reserve space for the offsets before measuring it
+        header['columns'] = {name: [dtype, 0] for name, _, dtype in COLUMNS}
+        offset = SharedDataset._align(len(MAGIC) + 8 + len(json.dumps(header)) + 32 * len(COLUMNS))
+        for name, _, dtype in COLUMNS:
+            header['columns'][name] = [dtype, offset]
+            offset = SharedDataset._align(offset + start * np.dtype(dtype).itemsize)
+        header_bytes = json.dumps(header).encode('utf-8')
+
+        temp_path = f'{path}.{os.getpid()}.tmp'
+        try:
+            with open(temp_path, 'wb') as f:
+                f.write(MAGIC + len(header_bytes).to_bytes(8, 'little') + header_bytes)
+                for name, _, dtype in COLUMNS:
+                    f.seek(header['columns'][name][1])
+                    for columns in branches.values():
+                        np.frombuffer(columns[name], dtype=columns[name].typecode).astype(dtype).tofile(f)
+                f.truncate(offset)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_path, path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    @staticmethod
+    def _align(offset: int) -> int:
+        """Rounds an offset up to the column alignment."""
+        return -(-offset // ALIGNMENT) * ALIGNMENT
+
+
+class SharedReviews:
+    """
+    A read-only sequence of the reviews of one branch in a shared dataset.
+
+    Review objects are only created while iterating or for filter results.
+
+    Attributes:
+        branch (SharedBranch): The branch the reviews belong to.
+    """
+
+    BATCH_SIZE = 10_000
+    """Number of reviews created at a time while iterating."""
+
+    def __init__(self, branch: 'SharedBranch') -> None:
+        self.branch = branch
+
+    def __len__(self) -> int:
+        return self.branch.review_count
+
+    def __iter__(self) -> Iterator[Review]:
+        for start in range(0, len(self), self.BATCH_SIZE):
+            yield from self.branch.make_reviews(np.arange(start, min(start + self.BATCH_SIZE, len(self))))
+
+    def filter(self, filters: Dict[str, str]) -> List[Review]:
+        """
+        Filters reviews on the shared columns, matching values the same way as Process.filter_reviews.
+
+        Args:
+            filters (Dict[str, str]): A dictionary containing filter keys and values.
+
+        Returns:
+            List[Review]: A list of reviews that match the specified filters.
+        """
+        mask = np.ones(len(self), dtype=bool)
+
+        for key, value in filters.items():
+            if key == 'year':
+                mask &= self.branch.column('year') == (int(value) if value.isdigit() else MISSING)
+            elif key == 'branch':
+                if Process.trans_str(self.branch.branch) != Process.trans_str(value):
+                    return []
+            elif key == 'reviewer_location':
+                codes = [code for code, location in enumerate(self.branch.dataset.locations)
+                         if Process.trans_str(location) == Process.trans_str(value)]
+                mask &= np.isin(self.branch.column('location'), codes)
+            else:
+                return Process.filter_reviews(list(self), filters)
+
+        return self.branch.make_reviews(np.flatnonzero(mask))
+
+
+class SharedBranch(Branch):
+    """
+    Represents a branch whose reviews are a range of rows in a shared dataset.
+
+    Aggregates are computed directly on the shared columns without creating Review objects.
+
+    Attributes:
+        branch (str): The name of the branch.
+        reviews (SharedReviews): The reviews associated with this branch.
+        dataset (Optional[SharedDataset]): The dataset holding the reviews, set once it has been attached.
+    """
+
+    def __init__(self, branch: str) -> None:
+        super().__init__(branch, [])
+        self.reviews = SharedReviews(self)
+        self.dataset: Optional[SharedDataset] = None
+        self._start = self._stop = 0
+
+    def attach(self, dataset: SharedDataset, start: int, stop: int) -> None:
+        """Points the branch at its rows in a shared dataset."""
+        self.dataset, self._start, self._stop = dataset, start, stop
+        self.mark_changed()
+
+    def column(self, name: str) -> np.ndarray:
+        """Returns a read-only view of a column for this branch's rows."""
+        if self.dataset is None:
+            return np.zeros(0, dtype=np.int64)
+        return self.dataset.columns[name][self._start:self._stop]
+
+    def make_reviews(self, rows: np.ndarray) -> List[Review]:
+        """Creates Review objects for rows of this branch, given as indexes relative to the branch."""
+        if not rows.size:
+            return []
+        locations, raw_dates = self.dataset.locations, self.dataset.raw_dates
+        return [Review(review_id, rating, year, month, locations[location], self.branch,
+                       raw_dates.get(self._start + row) if raw_dates else None)
+                for row, review_id, rating, year, month, location in
+                zip(rows.tolist(), *(self.column(name)[rows].tolist() for name, _, _ in COLUMNS))]
+
+    def get_reviews_years(self) -> List[str]:
+        """Returns a sorted list of unique years from the reviews."""
+        return sorted(str(year) if year != MISSING else 'missing' for year in np.unique(self.column('year')).tolist())
+
+    @property
+    def avg_rating(self) -> float:
+        """Calculates and returns the average rating for the branch."""
+        ratings = self.column('rating')
+        return round(float(ratings.mean()), 1) if ratings.size else 0
+
+    @property
+    def review_count(self) -> int:
+        """Returns the total number of reviews."""
+        return self._stop - self._start
+
+    def location_totals(self) -> Tuple[List[str], np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Aggregates ratings by reviewer location.
+
+        Returns:
+            Tuple[List[str], np.ndarray, np.ndarray, np.ndarray]: Reviewer locations with their review counts,
+            rating sums and sums of squared ratings.
+        """
+        if self.dataset is None:
+            return [], np.zeros(0, dtype=np.int64), np.zeros(0), np.zeros(0)
+
+        codes, ratings = self.column('location'), self.column('rating').astype(np.float64)
+        size = len(self.dataset.locations)
+        counts = np.bincount(codes, minlength=size)
+        present = np.flatnonzero(counts)
+        return ([self.dataset.locations[code] for code in present.tolist()], counts[present],
+                np.bincount(codes, weights=ratings, minlength=size)[present],
+                np.bincount(codes, weights=ratings ** 2, minlength=size)[present])
+
+    def time_keys(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Returns the year, month and rating of every review as integer arrays."""
+        return self.column('year'), self.column('month'), self.column('rating')
+
+    @property
+    def fingerprint(self) -> str:
+        """
+        Returns a hash of the reviews, used to detect changes between exports.
+
+        The hash only depends on this branch's reviews and equals the one of an in-memory Branch with the same reviews.
+        Location codes and timestamps are converted back to text a batch at a time.
+        """
+        digest = hashlib.blake2b(digest_size=16)
+        if self.dataset is None:
+            return digest.hexdigest()
+
+        locations, raw_dates = self.dataset.locations, self.dataset.raw_dates
+        for start in range(0, self.review_count, SharedReviews.BATCH_SIZE):
+            batch = slice(start, start + SharedReviews.BATCH_SIZE)
+            review_ids, ratings, years, months, codes = (self.column(name)[batch].tolist() for name, _, _ in COLUMNS)
+            Branch.update_fingerprint(digest, (
+                (review_id, rating, Review.format_date(year, month, raw_dates.get(self._start + start + row)),
+                 locations[code])
+                for row, (review_id, rating, year, month, code) in
+                enumerate(zip(review_ids, ratings, years, months, codes))))
+        return digest.hexdigest()
+
+
+class SharedLoader(ReviewLoader):
+    """
+    Attaches to a shared dataset file, or parses the CSV file and publishes it first.
+
+    If the dataset file was published from the current version of the CSV file with the same settings, it is
+    mapped read-only without parsing. Otherwise the CSV file is parsed into compact columns, published for
+    other sessions, and then mapped like any other session would. The loaded branches are SharedBranch objects
+    and only become ready once the dataset has been published.
+
+    Attributes:
+        shared_path (str): Path to the shared dataset file.
+        dataset (Optional[SharedDataset]): The attached dataset.
+    """
+
+    def __init__(self, file_path: str, shared_path: str, deduplicate: bool = True) -> None:
+        """
+        Initializes the loader without reading any file.
+
+        Args:
+            file_path (str): Path to the CSV file.
+            shared_path (str): Path to the shared dataset file. It is created if it does not exist.
+            deduplicate (bool, optional): Drop reviews whose ID was already loaded. Defaults to True.
+        """
+        super().__init__(file_path, deduplicate)
+        self.shared_path = shared_path
+        self.dataset: Optional[SharedDataset] = None
+        self._columns: Dict[str, Dict[str, array]] = {}
+        self._location_codes: Dict[str, int] = {}
+        self._raw_dates: Dict[str, Dict[int, str]] = {}
+
+    def run(self) -> None:
+        """Attaches to the shared dataset, publishing it first if it is missing or out of date."""
+        try:
+            dataset = SharedDataset(self.shared_path)
+        except (OSError, ValueError):
+            dataset = None
+
+        if dataset is None or dataset.header['source'] != f'{self.source}:{self.deduplicate}':
+            super().run()
+            return
+
+        self.report = ValidationReport(**dataset.header['report'])
+        self._attach(dataset)
+        self.bytes_read = self.total_bytes
+        self.rows_read = dataset.header['rows']
+        self._finish()
+
+    def _attach(self, dataset: SharedDataset) -> None:
+        """Points every branch at its rows in the dataset."""
+        self.dataset = dataset
+        for branch, start, stop in dataset.header['branches']:
+            if branch not in self.branches:
+                self.branches[branch] = self._new_branch(branch)
+            self.branches[branch].attach(dataset, start, stop)
+
+    def _new_branch(self, branch: str) -> Branch:
+        """Creates a branch to be attached to the shared dataset."""
+        return SharedBranch(branch)
+
+    def _store(self, branch: Branch, rows: Iterator[tuple]) -> int:
+        """Appends parsed rows to the compact columns of their branch."""
+        if branch.branch not in self._columns:
+            self._columns[branch.branch] = {name: array(typecode) for name, typecode, _ in COLUMNS}
+        columns = self._columns[branch.branch]
+
+        rows = list(rows)
+        if rows:
+            raw_dates = self._raw_dates.setdefault(branch.branch, {})
+            for row, (*_, raw_date) in enumerate(rows, len(columns['review_id'])):
+                if raw_date is not None:
+                    raw_dates[row] = raw_date
+
+            review_ids, ratings, years, months, locations, *_ = zip(*rows)
+            columns['review_id'].extend(review_ids)
+            columns['rating'].extend(ratings)
+            columns['year'].extend(years)
+            columns['month'].extend(months)
+            columns['location'].extend(self._location_codes.setdefault(location, len(self._location_codes))
+                                       for location in locations)
+        return len(rows)
+
+    def _switch_branch(self, previous: Optional[str], branch: str) -> str:
+        """Keeps a branch loading until the dataset is published, as its reviews are only attached then."""
+        with self._condition:
+            self.branches.setdefault(branch, self._new_branch(branch))
+            self._condition.notify_all()
+        return branch
+
+    def _finish(self) -> None:
+        """Publishes and attaches the parsed columns before marking loading as finished."""
+        if self._columns and self.error is None:
+            try:
+                SharedDataset.publish(self.shared_path, f'{self.source}:{self.deduplicate}', self._columns,
+                                      list(self._location_codes), self._raw_dates, self.report)
+                self._columns.clear()
+                self._raw_dates.clear()
+                self._attach(SharedDataset(self.shared_path))
+            except (OSError, ValueError) as e:
+                self.error = e
+        super()._finish()
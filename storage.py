@@ -0,0 +1,364 @@
+"""
+This module provides an SQLite storage engine for review data.
+
+It bulk-loads the review CSV into a local SQLite file, so that datasets larger than memory can be
+analysed. Branches loaded this way answer filtering and aggregate queries with SQL, and can be used
+anywhere an in-memory Branch is expected.
+
+Functions:
+- Bulk-load reviews from a CSV file into an indexed SQLite database.
+- Reuse an existing database if the CSV file has not changed.
+- Answer branch queries and aggregates with SQL.
+"""
+
+import hashlib
+import json
+import mmap
+import os
+import sqlite3
+import threading
+from typing import List, Dict, Tuple, Iterator, Optional, Union
+import numpy as np
+from exporter import Branch, Review, MISSING
+from process import Process, ReviewLoader, ValidationReport
+
+
+class SQLiteReviews:
+    """
+    A read-only sequence of the reviews of one branch stored in SQLite.
+
+    Reviews are streamed from the database in batches when iterated, so they never need to fit in memory.
+
+    Attributes:
+        branch (SQLiteBranch): The branch the reviews belong to.
+    """
+
+    BATCH_SIZE = 10_000
+    """Number of rows fetched from the database at a time."""
+
+    def __init__(self, branch: 'SQLiteBranch') -> None:
+        self.branch = branch
+
+    def __len__(self) -> int:
+        return self.branch.review_count
+
+    def __iter__(self) -> Iterator[Review]:
+        cursor = self.branch.store.connection().execute(
+            'SELECT review_id, rating, year, month, reviewer_location, branch, raw_date FROM reviews WHERE branch = ? '
+            'ORDER BY rowid', (self.branch.branch,))
+        while rows := cursor.fetchmany(self.BATCH_SIZE):
+            yield from (Review(*row) for row in rows)
+
+    def filter(self, filters: Dict[str, str]) -> List[Review]:
+        """
+        Filters reviews in the database, matching values the same way as Process.filter_reviews.
+
+        Args:
+            filters (Dict[str, str]): A dictionary containing filter keys and values.
+
+        Returns:
+            List[Review]: A list of reviews that match the specified filters.
+        """
+        clauses = ['branch = ?']
+        params: List[Union[str, int]] = [self.branch.branch]
+
+        for key, value in filters.items():
+            if key == 'year':
+                clauses.append('year = ?')
+                params.append(int(value) if value.isdigit() else MISSING)
+            elif key in ('branch', 'reviewer_location'):
+                matches = [item for item in self.branch.store.distinct(key)
+                           if Process.trans_str(item) == Process.trans_str(value)]
+                clauses.append(f'{key} IN ({", ".join("?" * len(matches))})')
+                params.extend(matches)
+            else:
+                return Process.filter_reviews(list(self), filters)
+
+        rows = self.branch.store.query(
+            'SELECT review_id, rating, year, month, reviewer_location, branch, raw_date FROM reviews '
+            f'WHERE {" AND ".join(clauses)} ORDER BY rowid', tuple(params))
+        return [Review(*row) for row in rows]
+
+
+class SQLiteBranch(Branch):
+    """
+    Represents a branch whose reviews are stored in SQLite.
+
+    Aggregates are computed by the database and cached until the branch changes.
+
+    Attributes:
+        branch (str): The name of the branch.
+        reviews (SQLiteReviews): The reviews associated with this branch.
+        store (SQLiteLoader): The database holding the reviews.
+    """
+
+    def __init__(self, branch: str, store: 'SQLiteLoader') -> None:
+        super().__init__(branch, [])
+        self.reviews = SQLiteReviews(self)
+        self.store = store
+        self._results: Dict[tuple, List[tuple]] = {}
+        self._results_version = self.version
+
+    def _query(self, sql: str, params: tuple = ()) -> List[tuple]:
+        """Runs a query for this branch, caching the result once the branch has been fully loaded."""
+        if self._results_version != self.version:
+            self._results.clear()
+            self._results_version = self.version
+
+        key = (sql, params)
+        if key in self._results:
+            return self._results[key]
+
+        rows = self.store.query(sql, (self.branch, *params))
+        if self.store.is_branch_ready(self.branch):
+            self._results[key] = rows
+        return rows
+
+    @property
+    def locations(self) -> List[str]:
+        """Returns a list of unique reviewer locations."""
+        return [row[0] for row in self._query('SELECT DISTINCT reviewer_location FROM reviews WHERE branch = ?')]
+
+    def get_reviews_years(self) -> List[str]:
+        """Returns a sorted list of unique years from the reviews."""
+        rows = self._query('SELECT DISTINCT year FROM reviews WHERE branch = ?')
+        return sorted(str(row[0]) if row[0] != MISSING else 'missing' for row in rows)
+
+    @property
+    def avg_rating(self) -> float:
+        """Calculates and returns the average rating for the branch."""
+        average = self._query('SELECT AVG(rating) FROM reviews WHERE branch = ?')[0][0]
+        return round(average, 1) if average is not None else 0
+
+    def location_totals(self) -> Tuple[List[str], np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Aggregates ratings by reviewer location.
+
+        Returns:
+            Tuple[List[str], np.ndarray, np.ndarray, np.ndarray]: Reviewer locations with their review counts,
+            rating sums and sums of squared ratings.
+        """
+        rows = self._query('SELECT reviewer_location, COUNT(*), SUM(rating), SUM(rating * rating) FROM reviews '
+                           'WHERE branch = ? GROUP BY reviewer_location')
+        totals = np.array([row[1:] for row in rows], dtype=np.int64).reshape(-1, 3)
+        return [row[0] for row in rows], totals[:, 0], totals[:, 1].astype(float), totals[:, 2].astype(float)
+
+    @property
+    def review_count(self) -> int:
+        """Returns the total number of reviews."""
+        return self._query('SELECT COUNT(*) FROM reviews WHERE branch = ?')[0][0]
+
+    @property
+    def fingerprint(self) -> str:
+        """Returns the hash of the reviews computed while loading, or streams them to hash them if it is missing."""
+        rows = self._query('SELECT fingerprint FROM branches WHERE name = ?') if self.store.done else []
+        return rows[0][0] if rows and rows[0][0] else super().fingerprint
+
+    def time_keys(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Returns the year, month and rating of every review as integer arrays."""
+        rows = self.store.query('SELECT year, month, rating FROM reviews WHERE branch = ? ORDER BY rowid',
+                                (self.branch,))
+        keys = np.array(rows, dtype=np.int32).reshape(-1, 3)
+        return keys[:, 0], keys[:, 1], keys[:, 2]
+
+    def month_totals(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Aggregates dated reviews by month.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray, np.ndarray]: Sorted month keys (year * 12 + month - 1) that have
+            reviews, with their review counts and rating sums.
+        """
+        rows = self._query('SELECT year * 12 + month - 1 AS month_key, COUNT(*), SUM(rating) FROM reviews '
+                           'WHERE branch = ? AND year != ? GROUP BY month_key ORDER BY month_key', (MISSING,))
+        totals = np.array(rows, dtype=np.int64).reshape(-1, 3)
+        return totals[:, 0], totals[:, 1], totals[:, 2].astype(float)
+
+
+class SQLiteLoader(ReviewLoader):
+    """
+    Loads reviews from a CSV file into a local SQLite database, either synchronously or in a background thread.
+
+    The CSV file is parsed with the same tokenizer as ReviewLoader and written to the database in bulk;
+    indexes on branch, reviewer location and year are built once all rows have been inserted. If the
+    database was already loaded from an unchanged CSV file with the same settings, it is reused without
+    parsing, together with its validation report. The fingerprint of each branch is computed while its rows
+    are inserted and stored with the branch, so exports can detect changes without reading the reviews back.
+    Duplicate review IDs are detected by a unique index in the database rather than in memory.
+    The loaded branches are SQLiteBranch objects.
+
+    Attributes:
+        database_path (str): Path to the SQLite database file.
+    """
+
+    SCHEMA_VERSION = 4
+    """Version of the database layout, so that databases created by older versions are reloaded."""
+
+    def __init__(self, file_path: str, database_path: str, deduplicate: bool = True) -> None:
+        """
+        Initializes the loader without reading the file.
+
+        Args:
+            file_path (str): Path to the CSV file.
+            database_path (str): Path to the SQLite database file. It is created if it does not exist.
+            deduplicate (bool, optional): Drop reviews whose ID was already loaded. Defaults to True.
+        """
+        super().__init__(file_path, deduplicate)
+        self.database_path = database_path
+        self._local = threading.local()
+        self._writer: sqlite3.Connection = None
+        self._distinct: Dict[str, List[str]] = {}
+        self._digests: Dict[str, 'hashlib.blake2b'] = {}
+
+    @property
+    def signature(self) -> str:
+        """Returns the source of the database contents and the settings and layout they were loaded with."""
+        return f'{self.source}:{self.deduplicate}:{self.SCHEMA_VERSION}'
+
+    def connection(self) -> sqlite3.Connection:
+        """Returns the database connection of the current thread."""
+        if not hasattr(self._local, 'connection'):
+            self._local.connection = sqlite3.connect(self.database_path)
+        return self._local.connection
+
+    def query(self, sql: str, params: tuple = ()) -> List[tuple]:
+        """
+        Runs a query against the database.
+
+        Args:
+            sql (str): The SQL query.
+            params (tuple, optional): The query parameters. Defaults to ().
+
+        Returns:
+            List[tuple]: The resulting rows.
+        """
+        return self.connection().execute(sql, params).fetchall()
+
+    def distinct(self, column: str) -> List[str]:
+        """
+        Returns the distinct values of a text column, cached once loading has finished.
+
+        Args:
+            column (str): Either 'branch' or 'reviewer_location'.
+
+        Returns:
+            List[str]: The distinct values.
+        """
+        if column in self._distinct:
+            return self._distinct[column]
+
+        values = [row[0] for row in self.query(f'SELECT DISTINCT {column} FROM reviews')]
+        if self.done:
+            self._distinct[column] = values
+        return values
+
+    def run(self) -> None:
+        """Loads the file into the database in the current thread, reusing the database if it is up to date."""
+        try:
+            current = self._is_current()
+        except sqlite3.Error:
+            current = False
+
+        if not current:
+            super().run()
+            return
+
+        for (branch,) in self.query('SELECT name FROM branches ORDER BY position'):
+            self.branches[branch] = self._new_branch(branch)
+        report = self.query("SELECT value FROM meta WHERE key = 'report'")
+        if report:
+            self.report = ValidationReport(**json.loads(report[0][0]))
+        self.bytes_read = self.total_bytes
+        self.rows_read = self.query('SELECT COUNT(*) FROM reviews')[0][0]
+        self._finish()
+
+    def _is_current(self) -> bool:
+        """Returns whether the database was fully loaded from the current version of the CSV file."""
+        if not os.path.exists(self.database_path):
+            return False
+        rows = self.query("SELECT value FROM meta WHERE key = 'source'")
+        return bool(rows) and rows[0][0] == self.signature
+
+    def _parse(self, mm: mmap.mmap) -> None:
+        """Parses the memory-mapped file into a freshly created reviews table."""
+        self._writer = sqlite3.connect(self.database_path)
+        try:
+            self._writer.execute('PRAGMA journal_mode = WAL')
+            self._writer.execute('PRAGMA synchronous = OFF')
+            self._writer.executescript('''
+                DROP TABLE IF EXISTS meta;
+                DROP TABLE IF EXISTS branches;
+                DROP TABLE IF EXISTS reviews;
+                CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT);
+                CREATE TABLE branches (name TEXT PRIMARY KEY, position INTEGER, fingerprint TEXT);
+                CREATE TABLE reviews (
+                    review_id INTEGER,
+                    rating INTEGER,
+                    year INTEGER,
+                    month INTEGER,
+                    reviewer_location TEXT,
+                    branch TEXT,
+                    raw_date TEXT
+                );
+            ''')
+            if self.deduplicate:
+                self._writer.execute('CREATE UNIQUE INDEX reviews_id ON reviews (review_id)')
+
+            super()._parse(mm)
+
+            # Dates were checked before duplicates were ignored by the database, so count them on the stored rows
+            missing, malformed = self._writer.execute(
+                'SELECT COUNT(*) - COUNT(raw_date), COUNT(raw_date) FROM reviews WHERE year = ?', (MISSING,)).fetchone()
+            for issue, count in ((ValidationReport.MISSING_DATE, missing),
+                                 (ValidationReport.MALFORMED_DATE, malformed)):
+                self.report.flagged.pop(issue, None)
+                self.report.flag(issue, count)
+
+            if not self.deduplicate:
+                self.report.flag(ValidationReport.DUPLICATE_ID, self._writer.execute(
+                    'SELECT COUNT(*) - COUNT(DISTINCT review_id) FROM reviews').fetchone()[0])
+
+            self._writer.executescript('''
+                CREATE INDEX reviews_branch_location ON reviews (branch, reviewer_location);
+                CREATE INDEX reviews_branch_year ON reviews (branch, year);
+                CREATE INDEX reviews_location ON reviews (reviewer_location);
+                ANALYZE;
+            ''')
+            self._writer.executemany('INSERT INTO branches VALUES (?, ?, ?)',
+                                     [(branch, position, self._digests[branch].hexdigest())
+                                      for position, branch in enumerate(self.branches)])
+            self._writer.execute("INSERT INTO meta VALUES ('source', ?)", (self.signature,))
+            self._writer.execute("INSERT INTO meta VALUES ('report', ?)",
+                                 (json.dumps({'dropped': self.report.dropped, 'flagged': self.report.flagged}),))
+            self._writer.commit()
+        finally:
+            self._writer.close()
+            self._writer = None
+
+    def _deduplicate(self, review_ids: List[Optional[int]], keep: Optional[List[bool]]) -> Optional[List[bool]]:
+        """Leaves duplicate review IDs to the database, so that loaded IDs are not kept in memory."""
+        return keep
+
+    def _store(self, branch: Branch, rows: Iterator[tuple]) -> int:
+        """Inserts parsed rows into the database, dropping rows whose review ID is already stored."""
+        rows = list(rows)
+        stored = self._writer.executemany('INSERT OR IGNORE INTO reviews VALUES (?, ?, ?, ?, ?, ?, ?)', rows).rowcount
+        self.report.drop(ValidationReport.DUPLICATE_ID, len(rows) - stored)
+
+        if stored < len(rows):
+            # Rows are only ever appended, so the stored rows are the ones after the rows stored so far
+            rows = self._writer.execute('SELECT review_id, rating, year, month, reviewer_location, branch, raw_date '
+                                        'FROM reviews WHERE rowid > ? ORDER BY rowid', (self.rows_read,))
+        digest = self._digests.setdefault(branch.branch, hashlib.blake2b(digest_size=16))
+        Branch.update_fingerprint(digest, ((row[0], row[1], Review.format_date(row[2], row[3], row[6]), row[4])
+                                           for row in rows))
+        return stored
+
+    def _new_branch(self, branch: str) -> Branch:
+        """Creates a branch backed by the database."""
+        return SQLiteBranch(branch, self)
+
+    def _switch_branch(self, previous, branch: str) -> str:
+        """Commits the rows of the previous branch before marking it as ready."""
+        self._writer.commit()
+        return super()._switch_branch(previous, branch)
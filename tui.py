@@ -13,7 +13,7 @@ Functions:
 
 from typing import Dict, List, Union, Tuple
 from exporter import Review, Branch, Table
-from process import Process
+from process import Process, QueryCache, ReviewLoader, ValidationReport, RatingPivot
 
 
 class TUI:
@@ -102,14 +102,14 @@ class TUI:
             print("No reviews available.")
             return
 
-        headers = list(vars(reviews[0]).keys())
-        rows = [list(vars(review).values()) for review in reviews]
+        headers = list(Review.FIELDS)
+        rows = [review.as_row() for review in reviews]
         column_widths = [16, 8, 16, 32]
 
         print(Table(headers, rows, column_widths))
 
     @staticmethod
-    def print_reviews_count(branch: str, loc: str, reviews: List[Review]) -> None:
+    def print_reviews_count(branch: str, loc: str, reviews: List[Review], scale: float = 1) -> None:
         """
         Displays the number of reviews for a given branch and location.
 
@@ -117,8 +117,55 @@ class TUI:
             branch (str): The branch name.
             loc (str): The reviewer location.
             reviews (List[Review]): List of matching reviews.
+            scale (float, optional): Number of reviews each matching review stands for when the reviews are
+                a sample. Defaults to 1.
         """
-        print(f'There are {len(reviews)} reviews from reviewers in {loc} for {branch.replace("_", " ")} branch.')
+        if scale == 1:
+            print(f'There are {len(reviews)} reviews from reviewers in {loc} for {branch.replace("_", " ")} branch.')
+        else:
+            print(f'There are an estimated {round(len(reviews) * scale)} reviews from reviewers in {loc} '
+                  f'for {branch.replace("_", " ")} branch ({len(reviews)} in the sample).')
+
+    @staticmethod
+    def print_load_progress(loader: ReviewLoader) -> None:
+        """
+        Displays the progress of a background load.
+
+        Args:
+            loader (ReviewLoader): The loader to report on.
+        """
+        percent = loader.bytes_read / loader.total_bytes if loader.total_bytes else 1.0
+        eta = f'{loader.eta:.1f}s' if loader.eta is not None else 'unknown'
+        print(f'Loading reviews: {percent:.0%} ({loader.bytes_read / 1e6:.1f} of {loader.total_bytes / 1e6:.1f} MB, '
+              f'{loader.bytes_per_second / 1e6:.1f} MB/s, {loader.rows_per_second:,.0f} rows/s, ETA {eta})')
+
+    @staticmethod
+    def print_validation_report(report: ValidationReport) -> None:
+        """
+        Displays the rows dropped or flagged while loading, by reason.
+
+        Args:
+            report (ValidationReport): The report to display.
+        """
+        if not report:
+            print('All reviews passed validation.')
+            return
+
+        headers = ['Issue', 'Rows', 'Action']
+        rows = ([[reason, count, 'Dropped'] for reason, count in report.dropped.items()] +
+                [[reason, count, 'Flagged'] for reason, count in report.flagged.items()])
+        print(Table(headers, rows, [24, 8, 8]))
+
+    @staticmethod
+    def print_cache_stats(cache: QueryCache) -> None:
+        """
+        Displays query cache usage statistics.
+
+        Args:
+            cache (QueryCache): The cache to report on.
+        """
+        print(f'Query cache: {cache.hits} hits, {cache.misses} misses '
+              f'({cache.hit_rate:.0%} hit rate, {len(cache)} cached results).')
 
     @staticmethod
     def validate_branch(msg: str, branches: Union[Dict[str, Branch], List[str]]) -> str:
@@ -149,19 +196,97 @@ class TUI:
                     print('Input does not correspond with any option!')
 
     @staticmethod
-    def print_avg_score_by_loc(branches: Dict[str, Branch]) -> None:
+    def print_avg_score_by_loc(pivot: RatingPivot, min_count: int = 1, sort_by: str = 'count') -> None:
         """
-        Displays the average rating per reviewer location in a formatted table.
+        Displays the average rating per park and reviewer location as a matrix, followed by the locations
+        whose ratings differ most from their park's average.
 
         Args:
-            branches (Dict[str, Branch]): Dictionary of branches with review data.
+            pivot (RatingPivot): The pivot of ratings by park and reviewer location.
+            min_count (int, optional): Minimum number of reviews for a cell to be shown. Defaults to 1.
+            sort_by (str, optional): How to sort the locations, one of RatingPivot.SORT_KEYS. Defaults to 'count'.
         """
-        headers = ['Park', 'Reviewer Location', 'Average Rating']
-        rows = [[branch_name, *rating] for branch_name, branch in branches.items() for rating in
-                branch.avg_rating_by_loc.items()]
-        column_widths = [32, 48, 16]
+        locations, averages, counts = pivot.matrix(min_count, sort_by)
+        if not locations:
+            print(f'No reviewer locations have at least {min_count} reviews.')
+            return
 
-        print(Table(headers, rows, column_widths))
+        headers = ['Reviewer Location', *[branch.replace('_', ' ') for branch in pivot.branches]]
+        rows = [[location, *[f'{averages[row, column]:.1f} ({counts[row, column]})' if counts[row, column] else '-'
+                             for row in range(len(pivot.branches))]]
+                for column, location in enumerate(locations)]
+        print(Table(headers, rows, [32] + [24] * len(pivot.branches)))
+
+        headers = ['Park', 'Reviewer Location', 'Reviews', 'Average Rating', 'Park Average', 'z-score']
+        rows = [[branch.replace('_', ' '), *rest] for branch, *rest in pivot.ranking(min_count)]
+        print('Reviewer locations rating their park most differently from average (|z-score| above 1.96 is '
+              'significant at 95%):')
+        print(Table(headers, rows, [24, 32, 8, 16, 16, 8]))
+
+    @staticmethod
+    def print_trends(branch: Branch, window: int = 3) -> None:
+        """
+        Displays monthly and yearly review trends for a branch in formatted tables.
+
+        Args:
+            branch (Branch): The branch to display trends for.
+            window (int, optional): Number of months in the rolling average window. Defaults to 3.
+        """
+        rolling = dict(branch.rolling_avg_rating(window))
+        headers = ['Month', 'Reviews', 'Average Rating', f'{window}-Month Rolling Average']
+        rows = [[month, count, avg, rolling.get(month, '-')] for (month, count), (_, avg) in
+                zip(branch.monthly_review_volume, branch.monthly_avg_rating)]
+        print(Table(headers, rows, [16, 16, 16, 24]))
+
+        headers = ['Year', 'Reviews', 'Average Rating', 'Reviews Change', 'Rating Change']
+        rows = [[year, count, avg, '-' if count_delta is None else f'{count_delta:+d}',
+                 '-' if avg_delta is None else f'{avg_delta:+.1f}']
+                for year, count, avg, count_delta, avg_delta in branch.yoy_deltas]
+        print(Table(headers, rows, [16, 16, 16, 16, 16]))
+
+    @staticmethod
+    def validate_int(msg: str, minimum: int = 0) -> int:
+        """
+        Validates and retrieves a whole number from the user.
+
+        Args:
+            msg (str): The message prompt for the user.
+            minimum (int, optional): The smallest accepted number. Defaults to 0.
+
+        Returns:
+            int: The validated number.
+        """
+        while True:
+            TUI.print_message(msg)
+            choice = TUI.handle_input()
+
+            if choice:
+                if choice.isdigit() and int(choice) >= minimum:
+                    TUI.print_confirmed_option(choice)
+                    return int(choice)
+                print(f'Input must be a whole number greater than or equal to {minimum}!')
+
+    @staticmethod
+    def validate_yes_no(msg: str) -> bool:
+        """
+        Asks the user a yes or no question.
+
+        Args:
+            msg (str): The question to ask.
+
+        Returns:
+            bool: True if the user answered yes.
+        """
+        while True:
+            TUI.print_message(msg)
+            choice = TUI.handle_input()
+
+            if choice:
+                choice = choice.upper()
+                if choice in ('Y', 'N'):
+                    TUI.print_confirmed_option('Yes' if choice == 'Y' else 'No')
+                    return choice == 'Y'
+                print('Input does not correspond with any option!')
 
     @staticmethod
     def validate_multi_choice(msg: str, options: List[str]) -> str:
@@ -4,18 +4,19 @@ All visualizations should be generated using functions in this module.
 """
 
 from typing import List, Union
-from exporter import Pie, Bar
+from exporter import Pie, Bar, Heatmap
 
 
 class Visual:
     """
     A utility class for generating and displaying charts.
 
-    This class provides a static method to create either Pie or Bar charts
+    This class provides a static method to create Pie, Bar or Heatmap charts
     based on the specified chart type.
 
     Methods:
-        show_chart(chart_type: str, title: str, labels: List[Union[str, int]], vals: List[int], legend: List[str] = None)
+        show_chart(chart_type: str, title: str, labels: List[Union[str, int]], vals: List[int],
+                   legend: List[str] = None, errors: List[float] = None)
             Generates and displays a chart of the specified type.
     """
 
@@ -25,27 +26,35 @@ class Visual:
 
     @staticmethod
     def show_chart(chart_type: str, title: str, labels: List[Union[str, int]], vals: List[int | float],
-                   legend: List[str] = None) -> None:
+                   legend: List[str] = None, errors: List[float] = None) -> None:
         """
         Creates and displays a chart of the specified type.
 
         Args:
-            chart_type (str): The type of chart to generate. Supported types: "pie", "bar".
+            chart_type (str): The type of chart to generate. Supported types: "pie", "bar", "heatmap".
             title (str): The title of the chart.
             labels (List[Union[str, int]]): The labels for each data point.
-            vals (List[int]): The values corresponding to each label.
+            vals (List[int]): The values corresponding to each label; for heatmaps, one row of values per
+                legend entry.
             legend (List[str], optional): The legend labels for the chart. Defaults to None.
+            errors (List[float], optional): Error bar half-widths for bar charts. Defaults to None.
 
         Raises:
             ValueError: If an unsupported chart type is provided.
         """
         chart_classes = {
             "pie": Pie,
-            "bar": Bar
+            "bar": Bar,
+            "heatmap": Heatmap
         }
 
         chart_type = chart_type.lower()
         if chart_type not in chart_classes:
             raise ValueError(f"Invalid chart type '{chart_type}'. Supported types are: {list(chart_classes.keys())}")
 
-        chart_classes[chart_type](title, labels, vals, legend)
+        if errors is not None:
+            if chart_type != 'bar':
+                raise ValueError(f"Error bars are only supported for bar charts, not '{chart_type}'.")
+            chart_classes[chart_type](title, labels, vals, legend, errors)
+        else:
+            chart_classes[chart_type](title, labels, vals, legend)